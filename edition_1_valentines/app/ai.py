@@ -2,18 +2,20 @@ import json
 import os
 import urllib.request
 from dataclasses import dataclass
-from functools import lru_cache
-
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
+from .cache import shared_cache
 from .db import get_db
+from .lazy import lazy_import
+from .metrics import llm_timer
+
+pd = lazy_import("pandas")
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
 
 
 @dataclass
 class SearchIndex:
-    vectorizer: TfidfVectorizer
+    vectorizer: object
     matrix: object
     records: list
 
@@ -74,7 +76,7 @@ def _call_openai_chat(messages, temperature=0.2, max_tokens=400):
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=20) as resp:
+        with llm_timer(), urllib.request.urlopen(req, timeout=20) as resp:
             data = json.loads(resp.read().decode("utf-8"))
         return data["choices"][0]["message"]["content"]
     except Exception:
@@ -130,7 +132,7 @@ def _call_openai_chat_with_error(messages, temperature=0.2, max_tokens=400):
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=20) as resp:
+        with llm_timer(), urllib.request.urlopen(req, timeout=20) as resp:
             data = json.loads(resp.read().decode("utf-8"))
         return data["choices"][0]["message"]["content"], source, None
     except urllib.error.HTTPError as exc:
@@ -229,7 +231,7 @@ def _heuristic_recommendation_reasons(recommendations):
     return reasons
 
 
-@lru_cache(maxsize=1)
+@shared_cache()
 def build_product_search_index():
     conn = get_db()
     try:
@@ -325,10 +327,10 @@ def build_product_search_index():
         texts.append(text)
 
     if not texts:
-        vectorizer = TfidfVectorizer(stop_words="english")
+        vectorizer = sklearn_text.TfidfVectorizer(stop_words="english")
         matrix = vectorizer.fit_transform([""])
     else:
-        vectorizer = TfidfVectorizer(stop_words="english")
+        vectorizer = sklearn_text.TfidfVectorizer(stop_words="english")
         matrix = vectorizer.fit_transform(texts)
 
     return SearchIndex(vectorizer=vectorizer, matrix=matrix, records=records)
@@ -342,7 +344,7 @@ def semantic_search(query, limit=8):
     if not index.records:
         return []
     vector = index.vectorizer.transform([query])
-    scores = cosine_similarity(vector, index.matrix).flatten()
+    scores = sklearn_pairwise.cosine_similarity(vector, index.matrix).flatten()
 
     ranked = scores.argsort()[::-1]
     results = []
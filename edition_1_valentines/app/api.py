@@ -0,0 +1,184 @@
+import json
+import sqlite3
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+
+from .queries import (
+    compatibility_score,
+    recommend_products,
+    recommend_products_with_explanations,
+    sales_all_products,
+    sales_dashboard_snapshot,
+    sales_filter_options,
+    sales_overview_filtered,
+    sales_product_count,
+    sales_products_page,
+    semantic_product_search,
+    supply_chain_alerts,
+    valentine_experience_plan,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, sqlite3.Row):
+        return dict(value)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    # Returned directly from handlers so FastAPI skips jsonable_encoder.
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(
+                content,
+                default=_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        return json.dumps(
+            content, default=_default, separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+
+
+def _table(rows, extra=None):
+    # Column names once plus one array per row; sqlite3.Row values are copied
+    # straight into tuples instead of being turned into dicts first.
+    if not rows:
+        return {"columns": [], "rows": []}
+    first = rows[0]
+    columns = list(first.keys())
+    if isinstance(first, dict):
+        values = [list(row.values()) for row in rows]
+    else:
+        values = [tuple(row) for row in rows]
+    if extra:
+        columns.extend(extra)
+    return {"columns": columns, "rows": values}
+
+
+def _record(row):
+    if row is None or isinstance(row, dict):
+        return row
+    return dict(zip(row.keys(), row))
+
+
+router = APIRouter(prefix="/api/v1", default_response_class=FastJSONResponse)
+
+
+@router.get("/sales/overview")
+def sales_overview_api(
+    category: str = "",
+    channel: str = "",
+    country: str = "",
+    month: str = "",
+    start: str = "",
+    end: str = "",
+    season: str = "",
+    period: str = "",
+    approximate: bool = False,
+    products: bool = False,
+    limit: int = Query(25, ge=1, le=500),
+    after: str = "",
+):
+    filters = {
+        "category": category,
+        "channel": channel,
+        "country": country,
+        "month": month,
+        "start": start,
+        "end": end,
+        "season": season,
+        "period": period,
+    }
+    summary, top_products = sales_overview_filtered(filters, approximate=approximate)
+    content = {
+        "filters": filters,
+        "approximate": approximate,
+        "summary": _record(summary),
+        "top_products": _table(top_products),
+    }
+    if products and approximate:
+        # The product table is estimated from the same sample as the summary;
+        # products with no sampled sale are not listed.
+        sampled = sales_dashboard_snapshot(filters, approximate=True)["products"]
+        rows, next_cursor = sales_products_page(sampled, limit, after)
+        content["products"] = _table(rows)
+        content["products_total"] = len(sampled)
+        content["next"] = next_cursor
+    elif products:
+        rows, next_cursor = sales_all_products(filters, limit, after)
+        content["products"] = _table(rows)
+        content["products_total"] = sales_product_count(filters)
+        content["next"] = next_cursor
+    return FastJSONResponse(content)
+
+
+@router.get("/sales/filters")
+def sales_filters_api():
+    return FastJSONResponse(sales_filter_options())
+
+
+@router.get("/recommendations/{customer_id}")
+def recommendations_api(
+    customer_id: str, limit: int = Query(5, ge=1, le=50), explain: bool = False
+):
+    if explain:
+        recommendations, mode = recommend_products_with_explanations(customer_id, limit)
+        return FastJSONResponse(
+            {
+                "customer_id": customer_id,
+                "explain_mode": mode.get("mode"),
+                "recommendations": _table(recommendations),
+            }
+        )
+    rows = recommend_products(customer_id, limit)
+    return FastJSONResponse({"customer_id": customer_id, "recommendations": _table(rows)})
+
+
+@router.get("/compatibility")
+def compatibility_api(user_a: str, user_b: str):
+    result = compatibility_score(user_a, user_b)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown user_id.")
+    return FastJSONResponse(
+        {
+            "score": result["score"],
+            "overlap": result["overlap"],
+            "user_a": _record(result["user_a"]),
+            "user_b": _record(result["user_b"]),
+        }
+    )
+
+
+@router.get("/search")
+def search_api(q: str = Query(..., min_length=1), limit: int = Query(8, ge=1, le=50)):
+    return FastJSONResponse({"query": q, "results": _table(semantic_product_search(q, limit))})
+
+
+@router.get("/supply-chain/alerts")
+def supply_chain_api(limit: int = Query(10, ge=1, le=100)):
+    alerts = supply_chain_alerts(limit)
+    table = _table([alert["row"] for alert in alerts], extra=["risk"])
+    table["rows"] = [(*values, alert["risk"]) for values, alert in zip(table["rows"], alerts)]
+    return FastJSONResponse({"alerts": table})
+
+
+@router.get("/planner")
+def planner_api(
+    budget: float = Query(..., gt=0),
+    persona: str = Query(...),
+    delivery_speed: str = Query(...),
+    region: str = "",
+):
+    plan = valentine_experience_plan(budget, persona, delivery_speed, region)
+    plan["recommendations"] = _table(plan["recommendations"])
+    return FastJSONResponse(plan)
@@ -0,0 +1,329 @@
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .db import DB_PATH
+
+# Results shared by every worker on the host. Entries are stored with the
+# namespace version current when computation started; bumping a version makes
+# all older entries invisible at once, including ones still being computed.
+# Hits hand every caller the same object, so cached results are read-only:
+# callers copy before changing them (semantic_search copies its records).
+CACHE_PATH = Path(os.getenv("VALENTINES_CACHE_PATH") or DB_PATH.with_name("cache.db"))
+DATA_NAMESPACE = "data"
+MAX_ENTRIES = 5000
+PRUNE_EVERY = 200
+LEASE_SECONDS = 30
+LEASE_POLL_SECONDS = 0.02
+# Values each worker keeps in memory on top of the shared file.
+LOCAL_ENTRIES = int(os.getenv("VALENTINES_CACHE_LOCAL_ENTRIES", "256"))
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS cache_versions ("
+    "namespace TEXT PRIMARY KEY, "
+    "version INTEGER NOT NULL, "
+    "bumped_at REAL NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    "namespace TEXT NOT NULL, "
+    "key TEXT NOT NULL, "
+    "version INTEGER NOT NULL, "
+    "value BLOB NOT NULL, "
+    "stored_at REAL NOT NULL, "
+    "PRIMARY KEY (namespace, key))",
+    "CREATE INDEX IF NOT EXISTS idx_cache_entries_stored_at ON cache_entries(stored_at)",
+    "CREATE TABLE IF NOT EXISTS cache_leases ("
+    "namespace TEXT NOT NULL, "
+    "key TEXT NOT NULL, "
+    "version INTEGER NOT NULL, "
+    "expires_at REAL NOT NULL, "
+    "PRIMARY KEY (namespace, key))",
+]
+
+_schema_ready = False
+_local = OrderedDict()
+_local_versions = {}
+_local_lock = threading.Lock()
+_thread = threading.local()
+_writes = 0
+_warned = set()
+
+
+def _warn_once(message, exc):
+    # A read-only or missing cache directory would otherwise log on every
+    # request; requests still succeed by computing directly.
+    if message not in _warned:
+        _warned.add(message)
+        logger.warning("%s at %s: %s", message, CACHE_PATH, exc)
+
+
+def _connect():
+    # One connection per thread, reopened after a fork, so a hit costs a
+    # single indexed lookup rather than a connect and close.
+    global _schema_ready
+    conn = getattr(_thread, "conn", None)
+    if conn is not None and _thread.pid == os.getpid():
+        return conn
+    conn = sqlite3.connect(CACHE_PATH, timeout=5)
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        # Cache files written before versions carried a timestamp.
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_versions)")}
+        if "bumped_at" not in columns:
+            conn.execute("ALTER TABLE cache_versions ADD COLUMN bumped_at REAL NOT NULL DEFAULT 0")
+        conn.commit()
+        _schema_ready = True
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _thread.conn = conn
+    _thread.pid = os.getpid()
+    return conn
+
+
+def _discard_connection():
+    conn = getattr(_thread, "conn", None)
+    _thread.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def _plain(value):
+    # sqlite3.Row cannot be pickled; dicts render the same in templates.
+    if isinstance(value, sqlite3.Row):
+        return dict(value)
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def current_version(namespace=DATA_NAMESPACE):
+    row = _connect().execute(
+        "SELECT version FROM cache_versions WHERE namespace = ?", (namespace,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def version_info(namespace=DATA_NAMESPACE):
+    # (version, unix time of the bump) for HTTP validators.
+    row = _connect().execute(
+        "SELECT version, bumped_at FROM cache_versions WHERE namespace = ?", (namespace,)
+    ).fetchone()
+    return (row[0], row[1]) if row else (0, 0.0)
+
+
+def bump_version(*namespaces):
+    namespaces = namespaces or (DATA_NAMESPACE,)
+    try:
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for namespace in namespaces:
+                conn.execute(
+                    "INSERT INTO cache_versions (namespace, version, bumped_at) VALUES (?, 1, ?) "
+                    "ON CONFLICT(namespace) DO UPDATE SET "
+                    "version = version + 1, bumped_at = excluded.bumped_at",
+                    (namespace, time.time()),
+                )
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+                conn.execute("DELETE FROM cache_leases WHERE namespace = ?", (namespace,))
+            conn.commit()
+            versions = dict(
+                conn.execute(
+                    f"SELECT namespace, version FROM cache_versions "
+                    f"WHERE namespace IN ({', '.join('?' for _ in namespaces)})",
+                    namespaces,
+                ).fetchall()
+            )
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    except sqlite3.Error as exc:
+        _discard_connection()
+        # A cache that cannot be invalidated must not keep serving: drop the
+        # local copies so this worker at least recomputes.
+        logger.warning("cache invalidation failed: %s", exc)
+        with _local_lock:
+            _local.clear()
+            _local_versions.clear()
+        return {}
+    return versions
+
+
+def _prune(conn):
+    conn.execute(
+        "DELETE FROM cache_entries WHERE rowid IN ("
+        "SELECT rowid FROM cache_entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+        (MAX_ENTRIES,),
+    )
+
+
+def _lookup(conn, namespace, key):
+    return conn.execute(
+        "SELECT COALESCE(v.version, 0), e.version, e.value "
+        "FROM (SELECT ? AS namespace, ? AS key) AS k "
+        "LEFT JOIN cache_versions v ON v.namespace = k.namespace "
+        "LEFT JOIN cache_entries e ON e.namespace = k.namespace AND e.key = k.key",
+        (namespace, key),
+    ).fetchall()[0]
+
+
+def _claim(conn, namespace, key, version):
+    # Only one worker computes a missing entry; the others wait for it
+    # instead of all running the same query after a deploy or an ingest.
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    lease = conn.execute(
+        "SELECT version, expires_at FROM cache_leases WHERE namespace = ? AND key = ?",
+        (namespace, key),
+    ).fetchone()
+    if lease is not None and lease[0] == version and lease[1] > now:
+        conn.rollback()
+        return False
+    conn.execute(
+        "INSERT OR REPLACE INTO cache_leases (namespace, key, version, expires_at) "
+        "VALUES (?, ?, ?, ?)",
+        (namespace, key, version, now + LEASE_SECONDS),
+    )
+    conn.commit()
+    return True
+
+
+def _wait(conn, namespace, key, version):
+    deadline = time.time() + LEASE_SECONDS
+    while time.time() < deadline:
+        time.sleep(LEASE_POLL_SECONDS)
+        current, entry_version, blob = _lookup(conn, namespace, key)
+        if current != version:
+            return None
+        if entry_version == version and blob is not None:
+            return pickle.loads(blob)
+        if conn.execute(
+            "SELECT 1 FROM cache_leases WHERE namespace = ? AND key = ? AND version = ?",
+            (namespace, key, version),
+        ).fetchone() is None:
+            return None
+    return None
+
+
+def _store(conn, namespace, key, version, value):
+    global _writes
+    conn.execute(
+        "INSERT OR REPLACE INTO cache_entries "
+        "(namespace, key, version, value, stored_at) VALUES (?, ?, ?, ?, ?)",
+        (namespace, key, version, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time()),
+    )
+    conn.execute("DELETE FROM cache_leases WHERE namespace = ? AND key = ?", (namespace, key))
+    _writes += 1
+    if _writes % PRUNE_EVERY == 0:
+        _prune(conn)
+    conn.commit()
+
+
+def _local_get(namespace, key, version):
+    with _local_lock:
+        # A newer version makes every older local value unreachable, so they
+        # are dropped as soon as this worker sees the bump.
+        if _local_versions.get(namespace, version) < version:
+            stale = [item for item, entry in _local.items() if item[0] == namespace and entry[0] < version]
+            for item in stale:
+                del _local[item]
+        _local_versions[namespace] = max(version, _local_versions.get(namespace, version))
+        entry = _local.get((namespace, key))
+        if entry is None or entry[0] != version:
+            return None
+        _local.move_to_end((namespace, key))
+        return entry
+
+
+def _local_put(namespace, key, version, value):
+    with _local_lock:
+        if version < _local_versions.get(namespace, version):
+            return
+        _local[(namespace, key)] = (version, value)
+        _local.move_to_end((namespace, key))
+        while len(_local) > LOCAL_ENTRIES:
+            _local.popitem(last=False)
+
+
+def _release(conn, namespace, key):
+    try:
+        conn.execute("DELETE FROM cache_leases WHERE namespace = ? AND key = ?", (namespace, key))
+        conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def get_or_compute(namespace, key, compute):
+    try:
+        conn = _connect()
+    except sqlite3.Error as exc:
+        _warn_once("cache unavailable", exc)
+        return _plain(compute())
+
+    try:
+        version, entry_version, blob = _lookup(conn, namespace, key)
+    except sqlite3.Error as exc:
+        _warn_once("cache read failed", exc)
+        _discard_connection()
+        return _plain(compute())
+
+    # Each worker keeps the most recently used values it saw; they stay
+    # valid for as long as the shared version is unchanged.
+    local = _local_get(namespace, key, version)
+    if local is not None:
+        return local[1]
+
+    value = None
+    if entry_version == version and blob is not None:
+        value = pickle.loads(blob)
+    else:
+        try:
+            if not _claim(conn, namespace, key, version):
+                value = _wait(conn, namespace, key, version)
+        except sqlite3.Error as exc:
+            _warn_once("cache lease failed", exc)
+            _discard_connection()
+            return _plain(compute())
+
+        if value is None:
+            try:
+                value = _plain(compute())
+            except Exception:
+                _release(conn, namespace, key)
+                raise
+            try:
+                _store(conn, namespace, key, version, value)
+            except sqlite3.Error as exc:
+                _warn_once("cache write failed", exc)
+                _discard_connection()
+                return value
+    _local_put(namespace, key, version, value)
+    return value
+
+
+def shared_cache(namespace=DATA_NAMESPACE):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = f"{fn.__module__}.{fn.__qualname__}:{args!r}:{sorted(kwargs.items())!r}"
+            return get_or_compute(namespace, key, lambda: fn(*args, **kwargs))
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
@@ -1,12 +1,35 @@
 from pathlib import Path
+from queue import Empty
+import logging
+import multiprocessing
+import os
 import sqlite3
-
-import pandas as pd
+import time
+import traceback
 
 from .db import DB_PATH
+from .lazy import lazy_import
+from .quality import CHUNK_ROWS, RULES, QualityGate, quarantine_table
+from .rollups import rebuild_rollups
+from .sales_sample import build_sales_sample
+from .sales_wide import SOURCE_TABLES as SALES_WIDE_SOURCES, build_sales_wide, ensure_sales_wide_indexes
+from .telemetry import rebuild_destination_stats
+from .work_dynamics import build_meeting_participants
+
+pd = lazy_import("pandas")
 
 BASE_DIR = Path(__file__).resolve().parent
-DATA_ROOT = BASE_DIR.parent / "data"
+DATA_ROOT = Path(os.getenv("VALENTINES_DATA_ROOT") or BASE_DIR.parent / "data")
+LOAD_WORKERS = int(os.getenv("VALENTINES_LOAD_WORKERS", "0")) or os.cpu_count() or 1
+# Parsed chunks waiting for the writer; bounds loader memory to about this
+# many chunks plus one per worker, however large the files are.
+LOAD_QUEUE_CHUNKS = int(os.getenv("VALENTINES_LOAD_QUEUE_CHUNKS", "4"))
+
+logger = logging.getLogger(__name__)
+
+# Per-dataset timings from the last cold load in this process; empty when
+# every table was already present.
+LOAD_REPORT = []
 
 DATASETS = {
     "dim_customer": DATA_ROOT / "cupid_chocolate_global" / "data" / "DimCustomer.csv",
@@ -27,6 +50,14 @@ DATASETS = {
     "work_dynamics": DATA_ROOT / "modern_work_dynamics" / "data" / "dataset_modern_work_dynamics.csv",
 }
 
+# Tables built from loaded datasets, their sources and their builders. Like
+# sales_wide, each is rebuilt whenever one of its sources is reloaded.
+DERIVED_TABLES = [
+    ("love_notes_destination_stats", ("love_notes_telemetry",), rebuild_destination_stats),
+    ("metric_rollups", ("love_notes_telemetry", "global_routing"), rebuild_rollups),
+    ("meeting_participant", ("work_dynamics",), build_meeting_participants),
+]
+
 INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_fact_sales_customer_id ON fact_sales(customer_id)",
     "CREATE INDEX IF NOT EXISTS idx_fact_sales_product_id ON fact_sales(product_id)",
@@ -34,6 +65,8 @@ INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_gift_recommender_customer_id ON gift_recommender(customer_id)",
     "CREATE INDEX IF NOT EXISTS idx_supply_chain_product_id ON supply_chain(product_id)",
     "CREATE INDEX IF NOT EXISTS idx_matchmaking_user_id ON matchmaking(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_dim_customer_customer_id ON dim_customer(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_dim_product_product_id ON dim_product(product_id)",
 ]
 
 
@@ -44,17 +77,225 @@ def _table_exists(conn, table_name):
     return cur.fetchone() is not None
 
 
-def ensure_db():
-    conn = sqlite3.connect(DB_PATH)
+def load_parent_keys(tables):
+    # Workers have no view of the database being written, so foreign keys
+    # are checked against the validated key columns of the parent CSVs. They
+    # are read once here, before any worker starts, and handed to each one.
+    wanted = {}
+    for name in tables:
+        for parent_table, column in RULES.get(name, {}).get("foreign_keys", {}).values():
+            if parent_table in DATASETS:
+                wanted.setdefault(parent_table, set()).add(column)
+
+    keys = {}
+    for parent_table, columns in wanted.items():
+        gate = QualityGate(parent_table, lambda *_: None)
+        values = {column: [] for column in columns}
+        with pd.read_csv(DATASETS[parent_table], chunksize=CHUNK_ROWS) as reader:
+            for chunk in reader:
+                valid = gate.check(chunk)[0]
+                for column in columns:
+                    values[column].append(valid[column].drop_duplicates())
+        for column, parts in values.items():
+            keys[(parent_table, column)] = pd.Index(pd.concat(parts).unique())
+    return keys
+
+
+def parse_dataset(table_name, csv_path, parent_keys=None):
+    # CSV parsing, type coercion and the quality gate, one chunk at a time.
+    # "chunks" yields (valid, rejected) pairs; rejected rows carry the first
+    # failing check as the reason and go to quarantine_<table>. "stats" is
+    # filled in once the chunks have been consumed.
+    if parent_keys is None:
+        parent_keys = load_parent_keys([table_name])
+    gate = QualityGate(table_name, lambda table, column: parent_keys.get((table, column)))
+    stats = {"quarantined": 0, "reasons": {}, "parse_ms": 0.0}
+
+    def chunks():
+        with pd.read_csv(csv_path, chunksize=CHUNK_ROWS) as reader:
+            while True:
+                start = time.perf_counter()
+                chunk = next(reader, None)
+                if chunk is None:
+                    break
+                checked = gate.check(chunk)
+                stats["parse_ms"] += (time.perf_counter() - start) * 1000
+                yield checked
+        stats["quarantined"] = gate.rejected
+        stats["reasons"] = gate.reasons
+
+    return {"table": table_name, "chunks": chunks(), "stats": stats}
+
+
+def _table_indexes(table_name):
+    return [statement for statement in INDEXES if f" ON {table_name}(" in statement]
+
+
+def _start_table(conn, table_name):
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(f"DROP TABLE IF EXISTS {quarantine_table(table_name)}")
+
+
+def _write_chunk(conn, table_name, valid, rejected):
+    valid.to_sql(table_name, conn, if_exists="append", index=False)
+    if not rejected.empty:
+        rejected.to_sql(quarantine_table(table_name), conn, if_exists="append", index=False)
+
+
+def _finish_table(conn, table_name, rows, stats, write_ms):
+    start = time.perf_counter()
+    for statement in _table_indexes(table_name):
+        conn.execute(statement)
+    conn.commit()
+    return {
+        "table": table_name,
+        "rows": rows,
+        "quarantined": stats["quarantined"],
+        "reasons": stats["reasons"],
+        "parse_ms": round(stats["parse_ms"], 1),
+        "write_ms": round(write_ms, 1),
+        "index_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def write_dataset(conn, parsed):
+    # Chunks are written as they are parsed, so memory holds one chunk
+    # whatever the size of the file. Write time excludes the parsing.
+    table_name = parsed["table"]
+    start = time.perf_counter()
+    _start_table(conn, table_name)
+    loaded = 0
+    for valid, rejected in parsed["chunks"]:
+        _write_chunk(conn, table_name, valid, rejected)
+        loaded += len(valid)
+    write_ms = (time.perf_counter() - start) * 1000 - parsed["stats"]["parse_ms"]
+    return _finish_table(conn, table_name, loaded, parsed["stats"], write_ms)
+
+
+def _parse_to_queue(queue, table_name, csv_path, parent_keys):
+    # Runs in a worker process. The queue is bounded, so a worker that gets
+    # ahead of the writer blocks instead of piling chunks up in memory.
+    try:
+        parsed = parse_dataset(table_name, csv_path, parent_keys)
+        for valid, rejected in parsed["chunks"]:
+            queue.put(("chunk", table_name, valid, rejected))
+        queue.put(("done", table_name, parsed["stats"]))
+    except Exception:
+        queue.put(("error", table_name, traceback.format_exc()))
+
+
+def _load_in_workers(conn, names, workers, parent_keys):
+    # Up to `workers` datasets are parsed at once. Their chunks arrive
+    # interleaved on one queue and the main process, the only SQLite writer,
+    # appends each to its table as it comes in.
+    context = multiprocessing.get_context()
+    queue = context.Queue(maxsize=LOAD_QUEUE_CHUNKS)
+    pending = list(names)
+    running = {}
+    written = {}
+    report = []
+
+    def start_next():
+        name = pending.pop(0)
+        process = context.Process(
+            target=_parse_to_queue, args=(queue, name, DATASETS[name], parent_keys), daemon=True
+        )
+        process.start()
+        running[name] = process
+
     try:
-        for table_name, csv_path in DATASETS.items():
-            if _table_exists(conn, table_name):
+        while pending and len(running) < workers:
+            start_next()
+        while running:
+            try:
+                message = queue.get(timeout=1.0)
+            except Empty:
+                for name, process in running.items():
+                    if not process.is_alive():
+                        raise RuntimeError(f"Parsing {name} exited with code {process.exitcode}")
                 continue
-            df = pd.read_csv(csv_path)
-            df.to_sql(table_name, conn, if_exists="replace", index=False)
+
+            kind, name, *payload = message
+            if kind == "error":
+                raise RuntimeError(f"Parsing {name} failed:\n{payload[0]}")
+            start = time.perf_counter()
+            if name not in written:
+                _start_table(conn, name)
+                written[name] = {"rows": 0, "write_ms": 0.0}
+            if kind == "chunk":
+                valid, rejected = payload
+                _write_chunk(conn, name, valid, rejected)
+                written[name]["rows"] += len(valid)
+                written[name]["write_ms"] += (time.perf_counter() - start) * 1000
+            else:
+                running.pop(name).join()
+                entry = written.pop(name)
+                report.append(_finish_table(conn, name, entry["rows"], payload[0], entry["write_ms"]))
+                if pending:
+                    start_next()
+    finally:
+        for process in running.values():
+            process.terminate()
+    return report
+
+
+def _load_datasets(conn, missing):
+    # Largest files are started first so the longest parses begin early and
+    # the writer has smaller tables to commit while they finish. Each table's
+    # indexes are built as soon as it is written, while the others parse.
+    missing = sorted(missing, key=lambda name: DATASETS[name].stat().st_size, reverse=True)
+    parent_keys = load_parent_keys(missing)
+    workers = min(LOAD_WORKERS, len(missing))
+    if workers <= 1:
+        return [write_dataset(conn, parse_dataset(name, DATASETS[name], parent_keys)) for name in missing]
+    return _load_in_workers(conn, missing, workers, parent_keys)
+
+
+def _timed_step(report, name, fn, conn):
+    start = time.perf_counter()
+    fn(conn)
+    report.append({"table": name, "write_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+
+def ensure_db(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        missing = [name for name in DATASETS if not _table_exists(conn, name)]
+        report = _load_datasets(conn, missing) if missing else []
 
         for statement in INDEXES:
             conn.execute(statement)
+
+        rebuild_sales_wide = not _table_exists(conn, "sales_wide") or set(missing) & set(SALES_WIDE_SOURCES)
+        if rebuild_sales_wide:
+            _timed_step(report, "sales_wide", build_sales_wide, conn)
+        else:
+            ensure_sales_wide_indexes(conn)
+        if rebuild_sales_wide or not _table_exists(conn, "sales_sample"):
+            _timed_step(report, "sales_sample", build_sales_sample, conn)
+        for table, sources, build in DERIVED_TABLES:
+            if set(missing) & set(sources) or not _table_exists(conn, table):
+                _timed_step(report, table, build, conn)
         conn.commit()
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+    if report:
+        LOAD_REPORT[:] = report
+        total_ms = (time.perf_counter() - start) * 1000
+        for entry in report:
+            if "rows" not in entry:
+                logger.info("built %s: %sms", entry["table"], entry["write_ms"])
+                continue
+            logger.info(
+                "loaded %s: rows=%s quarantined=%s parse=%sms write=%sms index=%sms",
+                entry["table"],
+                entry["rows"],
+                entry["quarantined"],
+                entry["parse_ms"],
+                entry["write_ms"],
+                entry["index_ms"],
+            )
+        logger.info("cold load finished in %.0f ms with %s workers", total_ms, min(LOAD_WORKERS, len(missing)) or 1)
+    return report
\ No newline at end of file
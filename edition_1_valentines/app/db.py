@@ -1,11 +1,64 @@
 from pathlib import Path
+import os
 import sqlite3
 
+from .metrics import connection_factory, instrument
+
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "valentines.db"
+DB_PATH = Path(os.getenv("VALENTINES_DB_PATH") or BASE_DIR / "valentines.db").resolve()
+
+# How request handlers open the database:
+#   rw        - plain connections (local development, CSV ingest on boot)
+#   ro        - mode=ro readers; ingestion still writes through get_write_db()
+#   immutable - immutable=1 readers with no locking or change detection. Only
+#               safe when the file is frozen, so writes are refused.
+READ_MODES = ("rw", "ro", "immutable")
+MMAP_SIZE = int(os.getenv("VALENTINES_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+_read_mode = os.getenv("VALENTINES_DB_MODE", "rw")
+if _read_mode not in READ_MODES:
+    raise ValueError(f"VALENTINES_DB_MODE must be one of {', '.join(READ_MODES)}")
+
+
+class WritesDisabled(RuntimeError):
+    pass
+
+
+def set_read_mode(mode):
+    global _read_mode
+    if mode not in READ_MODES:
+        raise ValueError(f"Unknown read mode: {mode}")
+    _read_mode = mode
+
+
+def read_mode():
+    return _read_mode
+
+
+def get_db(check_same_thread=True):
+    # Streaming responses advance their generator from whichever threadpool
+    # thread is free, so they open connections with check_same_thread=False.
+    if _read_mode == "rw":
+        conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread, factory=connection_factory())
+    else:
+        flag = "immutable=1" if _read_mode == "immutable" else "mode=ro"
+        conn = sqlite3.connect(
+            f"{DB_PATH.as_uri()}?{flag}",
+            uri=True,
+            check_same_thread=check_same_thread,
+            factory=connection_factory(),
+        )
+    if MMAP_SIZE:
+        # Reads are served from the OS page cache shared by every worker
+        # instead of being copied into each connection's private cache.
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.row_factory = sqlite3.Row
+    return instrument(conn)
 
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+def get_write_db():
+    if _read_mode == "immutable":
+        raise WritesDisabled("The database is served immutable; writes are disabled.")
+    conn = sqlite3.connect(DB_PATH, factory=connection_factory())
     conn.row_factory = sqlite3.Row
-    return conn
+    return instrument(conn)
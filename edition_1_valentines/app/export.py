@@ -0,0 +1,273 @@
+import csv
+import importlib.util
+import io
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from .db import get_db
+from .http_cache import conditional_get
+from .lazy import lazy_import
+from .queries import _sales_filters, supply_chain_risk
+
+# Parquet is optional; pyarrow is only imported by the first Parquet export.
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+# Rows are pulled from the SQLite cursor in fixed batches and written out
+# as they arrive, so memory depends on the batch size rather than on the
+# size of the export. One Parquet row group is written per batch.
+BATCH_ROWS = int(os.getenv("VALENTINES_EXPORT_BATCH_ROWS", "5000"))
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _sales_params(request):
+    return {
+        "category": request.query_params.get("category") or "",
+        "channel": request.query_params.get("channel") or "",
+        "country": request.query_params.get("country") or "",
+        "month": request.query_params.get("month") or "",
+        "start": request.query_params.get("start") or "",
+        "end": request.query_params.get("end") or "",
+        "season": request.query_params.get("season") or "",
+        "period": request.query_params.get("period") or "",
+    }
+
+
+def _sales_query(request):
+    where_sql, params = _sales_filters(_sales_params(request))
+    return (
+        "SELECT sale_id, full_date, product_id, product_name, category, "
+        "store_id, store_name, channel, country_code, customer_id, loyalty_tier, promo_name, "
+        "quantity_sold, unit_price, discount_amount, total_amount, cost_amount "
+        f"FROM sales_wide {where_sql} "
+        "ORDER BY date_id, sale_id",
+        params,
+    )
+
+
+def _sales_products_query(request):
+    where_sql, params = _sales_filters(_sales_params(request))
+    return (
+        "SELECT product_name, TOTAL(total_amount) AS revenue, "
+        "SUM(total_amount - cost_amount) AS profit, "
+        "SUM(quantity_sold) AS units "
+        f"FROM sales_wide {where_sql} "
+        "GROUP BY product_name "
+        "ORDER BY revenue DESC, product_name",
+        params,
+    )
+
+
+def _sales_categories_query(request):
+    where_sql, params = _sales_filters(_sales_params(request))
+    return (
+        "SELECT category, COUNT(*) AS orders, TOTAL(total_amount) AS revenue, "
+        "SUM(total_amount - cost_amount) AS profit, "
+        "SUM(quantity_sold) AS units "
+        f"FROM sales_wide {where_sql} "
+        "GROUP BY category "
+        "ORDER BY revenue DESC, category",
+        params,
+    )
+
+
+def _supply_chain_query(request):
+    return (
+        "SELECT sc.order_id, sc.product_id, dp.product_name, sc.vendor_lead_time_days, "
+        "sc.stock_level, sc.order_quantity, sc.delay_reason, sc.region, sc.cost_per_unit "
+        "FROM supply_chain sc "
+        "JOIN dim_product dp ON sc.product_id = dp.product_id "
+        "ORDER BY sc.order_id",
+        [],
+    )
+
+
+def _telemetry_query(request):
+    return (
+        "SELECT message_id, timestamp, region_origin, region_destination, latency_ms, "
+        "retry_count, delivery_status, device_type, network_speed_mbps, batch_id "
+        "FROM love_notes_telemetry "
+        "ORDER BY timestamp, message_id",
+        [],
+    )
+
+
+def _rollups_query(request):
+    clauses = []
+    params = []
+    for column in ("metric", "granularity", "region"):
+        value = request.query_params.get(column)
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where_sql = ""
+    if clauses:
+        where_sql = "WHERE " + " AND ".join(clauses) + " "
+    return (
+        "SELECT metric, granularity, region, bucket_start, samples, events, successes, "
+        "value_sum, value_max "
+        "FROM metric_rollups "
+        f"{where_sql}"
+        "ORDER BY metric, granularity, bucket_start, region",
+        params,
+    )
+
+
+def _recommendations_query(request):
+    customer_id = request.query_params.get("customer_id")
+    where_sql = ""
+    params = []
+    if customer_id:
+        where_sql = "WHERE customer_id = ? "
+        params.append(customer_id)
+    return (
+        "SELECT event_id, event_ts, event_type, customer_id, product_name, product_category, "
+        "unit_price, list_price, discount_pct, rating, gift_persona, delivery_speed, returned_flag "
+        "FROM gift_recommender "
+        f"{where_sql}"
+        "ORDER BY event_ts, event_id",
+        params,
+    )
+
+
+# name -> (query builder, per-row extra columns)
+EXPORTS = {
+    "sales": (_sales_query, None),
+    "sales-products": (_sales_products_query, None),
+    "sales-categories": (_sales_categories_query, None),
+    "supply-chain": (_supply_chain_query, ("risk", supply_chain_risk)),
+    "telemetry": (_telemetry_query, None),
+    "rollups": (_rollups_query, None),
+    "recommendations": (_recommendations_query, None),
+}
+
+
+def iter_batches(sql, params, extra=None, batch_rows=BATCH_ROWS):
+    # Yields the column names, then lists of row tuples. The connection is
+    # closed when the generator finishes or the client goes away.
+    conn = get_db(check_same_thread=False)
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [item[0] for item in cursor.description]
+        if extra:
+            columns.append(extra[0])
+        yield columns
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            if extra:
+                yield [(*row, extra[1](row)) for row in rows]
+            else:
+                yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def stream_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(batches))
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    # ParquetWriter writes here; whatever it wrote since the last row group
+    # is handed to the response and dropped.
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _schema(columns, rows):
+    # SQLite has no column types on a result set, so they are taken from the
+    # first batch. Columns that are entirely NULL there become strings.
+    fields = []
+    for index, name in enumerate(columns):
+        kind = pa.array([row[index] for row in rows]).type
+        if pa.types.is_null(kind):
+            kind = pa.string()
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def _column(values, kind):
+    if pa.types.is_string(kind):
+        values = [None if value is None else str(value) for value in values]
+    return pa.array(values, type=kind)
+
+
+def stream_parquet(batches):
+    columns = next(batches)
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for rows in batches:
+            if writer is None:
+                schema = _schema(columns, rows)
+                writer = pq.ParquetWriter(sink, schema, compression="zstd")
+            arrays = [
+                _column([row[index] for row in rows], field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+        if writer is None:
+            schema = pa.schema([pa.field(name, pa.string()) for name in columns])
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+router = APIRouter(prefix="/export")
+
+
+@router.get("/{name}.{fmt}")
+@conditional_get
+def export_table(request: Request, name: str, fmt: str):
+    if name not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {name}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown format: {fmt}")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed.")
+
+    build_query, extra = EXPORTS[name]
+    sql, params = build_query(request)
+    batches = iter_batches(sql, params, extra)
+    body = stream_csv(batches) if fmt == "csv" else stream_parquet(batches)
+    return StreamingResponse(
+        body,
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,66 @@
+from markupsafe import Markup, escape
+
+from .cache import DATA_NAMESPACE, get_or_compute
+from .queries import (
+    SALES_PERIODS,
+    list_customers,
+    list_matchmaking_users,
+    list_products,
+    list_regions,
+    sales_filter_options,
+)
+
+# Dropdowns are rendered once per data version and page and then served
+# from the shared cache as ready-made <option> HTML. The selected option is
+# marked on the cached string, so it does not need its own entry.
+PAGE_SIZE = 60
+OPTIONS_TEMPLATE = "_options.html"
+
+
+def _filter_values(field):
+    return lambda after: (sales_filter_options()[field], None)
+
+
+# kind -> (loader(after) returning (items, next_cursor), macro, macro kwargs)
+OPTION_LISTS = {
+    "customers": (lambda after: list_customers(PAGE_SIZE, after), "customer_options", {}),
+    "customers-short": (
+        lambda after: list_customers(PAGE_SIZE, after),
+        "customer_options",
+        {"tier": False},
+    ),
+    "users": (lambda after: list_matchmaking_users(PAGE_SIZE, after), "user_options", {}),
+    "products": (lambda after: list_products(PAGE_SIZE, after), "product_options", {}),
+    "regions": (lambda after: (list_regions(50), None), "value_options", {}),
+    "categories": (_filter_values("categories"), "value_options", {}),
+    "channels": (_filter_values("channels"), "value_options", {}),
+    "countries": (_filter_values("countries"), "value_options", {}),
+    "months": (_filter_values("months"), "value_options", {}),
+    "seasons": (_filter_values("seasons"), "value_options", {}),
+    "periods": (
+        lambda after: ([(key, label) for key, (label, _) in SALES_PERIODS.items()], None),
+        "labeled_options",
+        {},
+    ),
+}
+
+
+def option_list(env, kind, after=None):
+    # Returns {"html", "next", "shown"}; "next" is the cursor of the
+    # following page for paged lists.
+    load, macro, kwargs = OPTION_LISTS[kind]
+
+    def render():
+        items, next_cursor = load(after or None)
+        module = env.get_template(OPTIONS_TEMPLATE).module
+        html = str(getattr(module, macro)(items, **kwargs)).strip()
+        return {"html": html, "next": next_cursor, "shown": len(items)}
+
+    return get_or_compute(DATA_NAMESPACE, f"options:{kind}:{after or ''}", render)
+
+
+def select_option(html, value):
+    if not value:
+        return Markup(html)
+    needle = f'value="{escape(value)}"'
+    return Markup(html.replace(needle, f"{needle} selected", 1))
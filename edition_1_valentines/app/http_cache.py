@@ -0,0 +1,109 @@
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from .cache import version_info
+
+# Dashboard pages only change when the data version does, so browsers and
+# proxies may keep a copy as long as they revalidate it. max-age stays 0 by
+# default so an ingest is visible on the next request.
+PAGE_MAX_AGE = int(os.getenv("VALENTINES_PAGE_MAX_AGE", "0"))
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+
+logger = logging.getLogger(__name__)
+
+
+def _validators(request):
+    try:
+        version, bumped_at = version_info()
+    except sqlite3.Error as exc:
+        # Without a shared version there is nothing safe to validate against.
+        logger.warning("conditional GET disabled: %s", exc)
+        return None
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode("utf-8")).hexdigest()[:16]
+    return {
+        "ETag": f'W/"{version}-{digest}"',
+        "Last-Modified": formatdate(int(bumped_at), usegmt=True),
+        "Cache-Control": f"public, max-age={PAGE_MAX_AGE}, must-revalidate",
+    }
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # Weak comparison: the W/ prefix is ignored on both sides.
+    wanted = etag.removeprefix("W/")
+    return any(item.strip().removeprefix("W/") == wanted for item in header.split(","))
+
+
+def _not_modified(request, validators):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, validators["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            modified = parsedate_to_datetime(validators["Last-Modified"])
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and modified <= since
+    return False
+
+
+def conditional_get(fn):
+    # Answers 304 before the handler runs any query when the client already
+    # holds the page for the current data version and query string.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        request = kwargs["request"]
+        validators = _validators(request)
+        if validators is None:
+            return fn(*args, **kwargs)
+        if _not_modified(request, validators):
+            return Response(status_code=304, headers=validators)
+        response = fn(*args, **kwargs)
+        if response.status_code == 200:
+            response.headers.update(validators)
+        return response
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def _fingerprint(path):
+    try:
+        return hashlib.sha256((STATIC_DIR / path).read_bytes()).hexdigest()[:12]
+    except OSError:
+        return None
+
+
+def static_url(path):
+    # The content hash in the URL lets the file be cached for a year; a
+    # changed file gets a new URL after the next restart.
+    fingerprint = _fingerprint(path)
+    if fingerprint is None:
+        return f"/static/{path}"
+    return f"/static/{path}?v={fingerprint}"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        query = scope.get("query_string", b"").decode("latin-1")
+        requested = dict(item.partition("=")[::2] for item in query.split("&") if item)
+        relative = Path(os.path.relpath(full_path, STATIC_DIR)).as_posix()
+        if requested.get("v") and requested["v"] == _fingerprint(relative):
+            response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
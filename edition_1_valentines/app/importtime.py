@@ -0,0 +1,67 @@
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(module="app.main"):
+    # Runs a fresh interpreter with -X importtime and returns
+    # [(self_us, cumulative_us, depth, name)] in import order.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def aggregate(entries):
+    # Self time summed per top-level package, so many small submodules of one
+    # dependency show up as a single line.
+    packages = {}
+    for self_us, _, _, name in entries:
+        package = name.split(".", 1)[0]
+        total, count = packages.get(package, (0, 0))
+        packages[package] = (total + self_us, count + 1)
+    return sorted(
+        ((package, total, count) for package, (total, count) in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregated import time report")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit non-zero above this total")
+    args = parser.parse_args()
+
+    entries = measure(args.module)
+    total_us = sum(entry[0] for entry in entries)
+    print(f"import {args.module}: {total_us / 1000:.0f} ms across {len(entries)} modules")
+    print(f"{'package':<28} {'ms':>8} {'share':>7} {'modules':>8}")
+    for package, package_us, count in aggregate(entries)[: args.top]:
+        print(f"{package:<28} {package_us / 1000:>8.1f} {package_us / total_us:>7.1%} {count:>8}")
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"over budget: {total_us / 1000:.0f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
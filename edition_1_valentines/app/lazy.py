@@ -0,0 +1,66 @@
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds spent importing each lazily loaded module in this process.
+LOAD_TIMES = {}
+
+# Heavy modules imported by the warm-up thread once the app has started.
+WARM_UP_MODULES = [
+    "pandas",
+    "numpy",
+    "sklearn.feature_extraction.text",
+    "sklearn.metrics.pairwise",
+    "sklearn.linear_model",
+    "joblib",
+]
+
+
+class LazyModule:
+    # Stands in for a module at import time and imports it on first
+    # attribute access, so modules that only some requests need are not paid
+    # for by every worker at boot.
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            if self._name not in LOAD_TIMES:
+                LOAD_TIMES[self._name] = round((time.perf_counter() - start) * 1000, 1)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def _warm_up(modules):
+    start = time.perf_counter()
+    for name in modules:
+        try:
+            LazyModule(name)._load()
+        except ImportError as exc:
+            logger.warning("warm-up could not import %s: %s", name, exc)
+    logger.info("warm-up imported %s modules in %.0f ms", len(modules), (time.perf_counter() - start) * 1000)
+
+
+def start_warm_up(modules=None):
+    thread = threading.Thread(
+        target=_warm_up, args=(modules or WARM_UP_MODULES,), name="import-warm-up", daemon=True
+    )
+    thread.start()
+    return thread
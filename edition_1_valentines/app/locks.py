@@ -0,0 +1,30 @@
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path):
+    # An exclusive flock on <path>.lock, held across worker processes. Where
+    # fcntl is missing or the lock file cannot be created, the block runs
+    # unlocked rather than failing.
+    path = Path(path)
+    try:
+        handle = open(path.with_name(f"{path.name}.lock"), "a")
+    except OSError as exc:
+        logger.warning("no lock for %s: %s", path, exc)
+        yield
+        return
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+    finally:
+        handle.close()
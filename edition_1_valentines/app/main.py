@@ -1,52 +1,133 @@
+import os
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import Body, FastAPI, Form, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
-
-from .data_loader import ensure_db
+from jinja2 import FileSystemBytecodeCache
+
+from .api import router as api_router
+from .cache import bump_version
+from .data_loader import LOAD_REPORT, ensure_db
+from .db import WritesDisabled
+from .export import router as export_router
+from .fragments import option_list, select_option
+from .http_cache import STATIC_DIR, FingerprintedStaticFiles, conditional_get, static_url
+from .lazy import LOAD_TIMES, start_warm_up
+from .metrics import MetricsMiddleware, instrument_templates, render_metrics
 from .queries import (
     analytics_overview,
     compatibility_score,
+    count_rows,
     gift_concierge,
     global_love_metrics,
-    list_customers,
-    list_matchmaking_users,
-    list_products,
-    list_regions,
     love_letter_data,
     love_letter_with_ai,
     order_quote,
+    participant_analytics,
+    participant_meetings,
+    quarantine_summary,
     recommend_products_with_explanations,
     sales_overview,
-    sales_all_products,
-    sales_filter_options,
     sales_chat_answer,
-    sales_overview_filtered,
+    sales_dashboard_snapshot,
+    sales_products_page,
     semantic_product_search,
     supply_chain_alerts,
     valentine_experience_plan,
 )
+from .moderation import MAX_BATCH_SIZE, moderation_model_info, score_messages
+from .rollups import ingest_routing_samples, time_series
+from .security_stream import DETECTOR
+from .slow_queries import THRESHOLD_SECONDS, recent_slow_queries, slow_query_summary
+from .snapshot import boot_lock, open_snapshot
+from .telemetry import ingest_love_note_batch
 
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR.parent / ".env")
 
 app = FastAPI(title="Valentine's Day Edition")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+# Added last so it wraps everything else, compression included.
+app.add_middleware(MetricsMiddleware)
+app.include_router(api_router)
+app.include_router(export_router)
 
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
+app.mount("/static", FingerprintedStaticFiles(directory=str(STATIC_DIR)), name="static")
 
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+# Compiled templates are kept on disk so a restarted worker loads bytecode
+# instead of parsing and compiling every template again.
+TEMPLATE_CACHE_DIR = Path(os.getenv("VALENTINES_TEMPLATE_CACHE") or BASE_DIR / ".template-cache")
+try:
+    TEMPLATE_CACHE_DIR.mkdir(exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+except OSError:
+    pass
+templates.env.globals["static_url"] = static_url
+instrument_templates(templates.env)
+
+PRODUCT_PAGE_SIZE = 25
+
+
+def _pager(request, next_cursor, total, shown=None):
+    # Forms post back to their own URL, so ?after= keeps the same page of
+    # options on the result view.
+    return {
+        "after": request.query_params.get("after") or "",
+        "next": next_cursor,
+        "total": total,
+        "shown": shown,
+    }
+
+
+def _approximate(value):
+    # "1" or "" for the dashboard filters; "0", "false" and "off" are off,
+    # like FastAPI's bool parsing in the JSON API.
+    return "1" if value.strip().lower() in ("1", "true", "on", "yes") else ""
+
+
+def _filter_options(filters):
+    return {
+        field: select_option(option_list(templates.env, kind)["html"], filters.get(field))
+        for field, kind in (
+            ("category", "categories"),
+            ("channel", "channels"),
+            ("country", "countries"),
+            ("month", "months"),
+            ("season", "seasons"),
+            ("period", "periods"),
+        )
+    }
+
+
+def _options(request, kind, table):
+    options = option_list(templates.env, kind, request.query_params.get("after"))
+    return options, _pager(request, options["next"], count_rows(table), options["shown"])
+
+
+@app.exception_handler(WritesDisabled)
+def writes_disabled_handler(request: Request, exc: WritesDisabled):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 
 @app.on_event("startup")
 def startup_event():
-    ensure_db()
+    with boot_lock():
+        if open_snapshot() is None:
+            ensure_db()
+    # The database may have been rebuilt or replaced since the shared cache
+    # was filled, so every boot starts a new data version.
+    bump_version()
+    if os.getenv("VALENTINES_WARM_UP", "1") != "0":
+        start_warm_up()
 
 
 @app.get("/", response_class=HTMLResponse)
+@conditional_get
 def index(request: Request):
     counts, scores = analytics_overview()
     return templates.TemplateResponse(
@@ -57,10 +138,15 @@ def index(request: Request):
 
 @app.get("/love-letter", response_class=HTMLResponse)
 def love_letter_form(request: Request):
-    customers = list_customers(60)
+    options, pager = _options(request, "customers", "dim_customer")
     return templates.TemplateResponse(
         "love_letter.html",
-        {"request": request, "customers": customers, "letter": None},
+        {
+            "request": request,
+            "customer_options": select_option(options["html"], None),
+            "pager": pager,
+            "letter": None,
+        },
     )
 
 
@@ -70,7 +156,7 @@ def love_letter_submit(
     customer_id: str = Form(...),
     tone: str = Form("light and professional"),
 ):
-    customers = list_customers(60)
+    options, pager = _options(request, "customers", "dim_customer")
     customer, events, letter_text, source, error = love_letter_with_ai(
         customer_id, tone
     )
@@ -83,18 +169,24 @@ def love_letter_submit(
     }
     return templates.TemplateResponse(
         "love_letter.html",
-        {"request": request, "customers": customers, "letter": letter},
+        {
+            "request": request,
+            "customer_options": select_option(options["html"], customer_id),
+            "pager": pager,
+            "letter": letter,
+        },
     )
 
 
 @app.get("/recommender", response_class=HTMLResponse)
 def recommender_form(request: Request):
-    customers = list_customers(60)
+    options, pager = _options(request, "customers-short", "dim_customer")
     return templates.TemplateResponse(
         "recommender.html",
         {
             "request": request,
-            "customers": customers,
+            "customer_options": select_option(options["html"], None),
+            "pager": pager,
             "recommendations": None,
             "selected_customer_id": None,
         },
@@ -103,13 +195,14 @@ def recommender_form(request: Request):
 
 @app.post("/recommender", response_class=HTMLResponse)
 def recommender_submit(request: Request, customer_id: str = Form(...)):
-    customers = list_customers(60)
+    options, pager = _options(request, "customers-short", "dim_customer")
     recommendations, mode = recommend_products_with_explanations(customer_id)
     return templates.TemplateResponse(
         "recommender.html",
         {
             "request": request,
-            "customers": customers,
+            "customer_options": select_option(options["html"], customer_id),
+            "pager": pager,
             "recommendations": recommendations,
             "explain_mode": mode.get("mode"),
             "selected_customer_id": customer_id,
@@ -119,10 +212,16 @@ def recommender_submit(request: Request, customer_id: str = Form(...)):
 
 @app.get("/compatibility", response_class=HTMLResponse)
 def compatibility_form(request: Request):
-    users = list_matchmaking_users(60)
+    options, pager = _options(request, "users", "matchmaking")
     return templates.TemplateResponse(
         "compatibility.html",
-        {"request": request, "users": users, "result": None},
+        {
+            "request": request,
+            "user_a_options": select_option(options["html"], None),
+            "user_b_options": select_option(options["html"], None),
+            "pager": pager,
+            "result": None,
+        },
     )
 
 
@@ -130,32 +229,48 @@ def compatibility_form(request: Request):
 def compatibility_submit(
     request: Request, user_a: str = Form(...), user_b: str = Form(...)
 ):
-    users = list_matchmaking_users(60)
+    options, pager = _options(request, "users", "matchmaking")
     result = compatibility_score(user_a, user_b)
     return templates.TemplateResponse(
         "compatibility.html",
-        {"request": request, "users": users, "result": result},
+        {
+            "request": request,
+            "user_a_options": select_option(options["html"], user_a),
+            "user_b_options": select_option(options["html"], user_b),
+            "pager": pager,
+            "result": result,
+        },
     )
 
 
 @app.get("/sales-dashboard", response_class=HTMLResponse)
+@conditional_get
 def sales_dashboard(request: Request):
     filters = {
         "category": request.query_params.get("category") or "",
         "channel": request.query_params.get("channel") or "",
         "country": request.query_params.get("country") or "",
         "month": request.query_params.get("month") or "",
+        "start": request.query_params.get("start") or "",
+        "end": request.query_params.get("end") or "",
+        "season": request.query_params.get("season") or "",
+        "period": request.query_params.get("period") or "",
+        "approximate": _approximate(request.query_params.get("approximate") or ""),
     }
-    summary, top_products = sales_overview_filtered(filters)
-    all_products = sales_all_products(filters)
-    options = sales_filter_options()
+    dashboard = sales_dashboard_snapshot(filters, approximate=bool(filters["approximate"]))
+    all_products, next_cursor = sales_products_page(
+        dashboard["products"], PRODUCT_PAGE_SIZE, request.query_params.get("after")
+    )
+    pager = _pager(request, next_cursor, len(dashboard["products"]))
+    options = _filter_options(filters)
     return templates.TemplateResponse(
         "sales_dashboard.html",
         {
             "request": request,
-            "summary": summary,
-            "top_products": top_products,
+            "summary": dashboard["summary"],
+            "top_products": dashboard["top_products"],
             "all_products": all_products,
+            "pager": pager,
             "filter_options": options,
             "filters": filters,
             "chat_question": "",
@@ -174,24 +289,38 @@ def sales_chat_submit(
     channel: str = Form(""),
     country: str = Form(""),
     month: str = Form(""),
+    start: str = Form(""),
+    end: str = Form(""),
+    season: str = Form(""),
+    period: str = Form(""),
+    approximate: str = Form(""),
 ):
     filters = {
         "category": category,
         "channel": channel,
         "country": country,
         "month": month,
+        "start": start,
+        "end": end,
+        "season": season,
+        "period": period,
+        "approximate": _approximate(approximate),
     }
-    summary, top_products = sales_overview_filtered(filters)
-    all_products = sales_all_products(filters)
-    options = sales_filter_options()
-    response, source, error = sales_chat_answer(question, filters)
+    dashboard = sales_dashboard_snapshot(filters, approximate=bool(filters["approximate"]))
+    all_products, next_cursor = sales_products_page(
+        dashboard["products"], PRODUCT_PAGE_SIZE, request.query_params.get("after")
+    )
+    pager = _pager(request, next_cursor, len(dashboard["products"]))
+    options = _filter_options(filters)
+    response, source, error = sales_chat_answer(question, filters, bool(filters["approximate"]))
     return templates.TemplateResponse(
         "sales_dashboard.html",
         {
             "request": request,
-            "summary": summary,
-            "top_products": top_products,
+            "summary": dashboard["summary"],
+            "top_products": dashboard["top_products"],
             "all_products": all_products,
+            "pager": pager,
             "filter_options": options,
             "filters": filters,
             "chat_question": question,
@@ -209,23 +338,37 @@ def sales_filter_submit(
     channel: str = Form(""),
     country: str = Form(""),
     month: str = Form(""),
+    start: str = Form(""),
+    end: str = Form(""),
+    season: str = Form(""),
+    period: str = Form(""),
+    approximate: str = Form(""),
 ):
     filters = {
         "category": category,
         "channel": channel,
         "country": country,
         "month": month,
+        "start": start,
+        "end": end,
+        "season": season,
+        "period": period,
+        "approximate": _approximate(approximate),
     }
-    summary, top_products = sales_overview_filtered(filters)
-    all_products = sales_all_products(filters)
-    options = sales_filter_options()
+    dashboard = sales_dashboard_snapshot(filters, approximate=bool(filters["approximate"]))
+    all_products, next_cursor = sales_products_page(
+        dashboard["products"], PRODUCT_PAGE_SIZE, request.query_params.get("after")
+    )
+    pager = _pager(request, next_cursor, len(dashboard["products"]))
+    options = _filter_options(filters)
     return templates.TemplateResponse(
         "sales_dashboard.html",
         {
             "request": request,
-            "summary": summary,
-            "top_products": top_products,
+            "summary": dashboard["summary"],
+            "top_products": dashboard["top_products"],
             "all_products": all_products,
+            "pager": pager,
             "filter_options": options,
             "filters": filters,
             "chat_question": "",
@@ -237,11 +380,134 @@ def sales_filter_submit(
 
 
 @app.get("/global-love", response_class=HTMLResponse)
+@conditional_get
 def global_love(request: Request):
-    delivery, routing = global_love_metrics()
+    delivery, routing, windows = global_love_metrics()
     return templates.TemplateResponse(
         "global_love.html",
-        {"request": request, "delivery": delivery, "routing": routing},
+        {
+            "request": request,
+            "delivery": delivery,
+            "routing": routing,
+            "windows": windows,
+        },
+    )
+
+
+@app.post("/telemetry/love-notes")
+def love_notes_ingest(payload: dict = Body(...)):
+    batch_id = payload.get("batch_id")
+    events = payload.get("events")
+    if not batch_id or not isinstance(events, list):
+        raise HTTPException(
+            status_code=400, detail="Expected a batch_id and a list of events."
+        )
+    return ingest_love_note_batch(str(batch_id), events)
+
+
+@app.post("/telemetry/routing")
+def routing_ingest(payload: dict = Body(...)):
+    samples = payload.get("samples")
+    if not isinstance(samples, list):
+        raise HTTPException(status_code=400, detail="Expected a list of samples.")
+    return ingest_routing_samples(samples)
+
+
+@app.get("/telemetry/timeseries")
+def telemetry_timeseries(
+    metric: str = "love_notes",
+    granularity: str = "minute",
+    window: int = 3600,
+    region: str = "",
+):
+    if metric not in ("love_notes", "routing"):
+        raise HTTPException(status_code=400, detail="Unknown metric.")
+    try:
+        points = time_series(metric, granularity, window, region or None)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "metric": metric,
+        "granularity": granularity,
+        "window": window,
+        "points": points,
+    }
+
+
+@app.post("/moderation/score")
+def moderation_score(payload: dict = Body(...)):
+    messages = payload.get("messages")
+    if not isinstance(messages, list):
+        raise HTTPException(status_code=400, detail="Expected a list of messages.")
+    if len(messages) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batches are limited to {MAX_BATCH_SIZE} messages.",
+        )
+
+    ids = []
+    texts = []
+    for position, item in enumerate(messages):
+        if isinstance(item, dict):
+            ids.append(item.get("id", position))
+            texts.append(str(item.get("text") or ""))
+        else:
+            ids.append(position)
+            texts.append(str(item or ""))
+
+    results = score_messages(texts)
+    for message_id, result in zip(ids, results):
+        result["id"] = message_id
+    return {"model": moderation_model_info(), "results": results}
+
+
+@app.post("/security/logins")
+def security_logins_ingest(payload: dict = Body(...)):
+    events = payload.get("events")
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="Expected a list of events.")
+    return DETECTOR.process_batch(events)
+
+
+@app.get("/security/alerts")
+def security_alerts(limit: int = 100):
+    return {"stats": DETECTOR.stats(), "alerts": DETECTOR.alerts(max(limit, 0))}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/slow-queries", response_class=HTMLResponse)
+def slow_queries_view(request: Request, limit: int = 50):
+    return templates.TemplateResponse(
+        "slow_queries.html",
+        {
+            "request": request,
+            "threshold_ms": None if THRESHOLD_SECONDS is None else THRESHOLD_SECONDS * 1000,
+            "summary": slow_query_summary(),
+            "recent": recent_slow_queries(max(limit, 0)),
+        },
+    )
+
+
+@app.get("/participants", response_class=HTMLResponse)
+def participants(request: Request):
+    user_id = request.query_params.get("user_id") or ""
+    rows, totals, reasons = participant_analytics(50)
+    profile, meetings = participant_meetings(user_id) if user_id else (None, [])
+    return templates.TemplateResponse(
+        "participants.html",
+        {
+            "request": request,
+            "participants": rows,
+            "totals": totals,
+            "reasons": reasons,
+            "user_id": user_id,
+            "profile": profile,
+            "meetings": meetings,
+        },
     )
 
 
@@ -268,6 +534,7 @@ def gift_concierge_submit(
 
 
 @app.get("/supply-chain", response_class=HTMLResponse)
+@conditional_get
 def supply_chain(request: Request):
     alerts = supply_chain_alerts()
     return templates.TemplateResponse(
@@ -278,10 +545,15 @@ def supply_chain(request: Request):
 
 @app.get("/order-app", response_class=HTMLResponse)
 def order_form(request: Request):
-    products = list_products(60)
+    options, pager = _options(request, "products", "dim_product")
     return templates.TemplateResponse(
         "order_app.html",
-        {"request": request, "products": products, "quote": None},
+        {
+            "request": request,
+            "product_options": select_option(options["html"], None),
+            "pager": pager,
+            "quote": None,
+        },
     )
 
 
@@ -292,20 +564,35 @@ def order_submit(
     quantity: int = Form(...),
     loyalty_tier: str = Form(...),
 ):
-    products = list_products(60)
+    options, pager = _options(request, "products", "dim_product")
     quote = order_quote(product_id, quantity, loyalty_tier)
     return templates.TemplateResponse(
         "order_app.html",
-        {"request": request, "products": products, "quote": quote},
+        {
+            "request": request,
+            "product_options": select_option(options["html"], product_id),
+            "pager": pager,
+            "quote": quote,
+        },
     )
 
 
+# No conditional GET: besides the data, the page shows this worker's import
+# times and load report, which differ between workers and restarts.
 @app.get("/analytics", response_class=HTMLResponse)
 def analytics(request: Request):
     counts, scores = analytics_overview()
+    quarantine = quarantine_summary()
     return templates.TemplateResponse(
         "analytics.html",
-        {"request": request, "counts": counts, "scores": scores},
+        {
+            "request": request,
+            "counts": counts,
+            "scores": scores,
+            "quarantine": quarantine,
+            "load_report": LOAD_REPORT,
+            "import_times": sorted(LOAD_TIMES.items(), key=lambda item: item[1], reverse=True),
+        },
     )
 
 
@@ -328,12 +615,12 @@ def semantic_search_submit(request: Request, query: str = Form(...)):
 
 @app.get("/valentine-planner", response_class=HTMLResponse)
 def valentine_planner_form(request: Request):
-    regions = list_regions(50)
+    regions = option_list(templates.env, "regions")
     return templates.TemplateResponse(
         "valentine_planner.html",
         {
             "request": request,
-            "regions": regions,
+            "region_options": select_option(regions["html"], None),
             "plan": None,
         },
     )
@@ -347,13 +634,13 @@ def valentine_planner_submit(
     delivery_speed: str = Form(...),
     region: str = Form(...),
 ):
-    regions = list_regions(50)
+    regions = option_list(templates.env, "regions")
     plan = valentine_experience_plan(budget, persona, delivery_speed, region)
     return templates.TemplateResponse(
         "valentine_planner.html",
         {
             "request": request,
-            "regions": regions,
+            "region_options": select_option(regions["html"], region),
             "plan": plan,
             "budget": budget,
             "persona": persona,
@@ -0,0 +1,317 @@
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import jinja2
+
+from . import slow_queries
+
+# Per-request timings, exported in the Prometheus text format at /metrics.
+# Each request gets a RequestTimings in a context variable; the SQLite
+# connections from get_db, the LLM client and template rendering add to it,
+# and the middleware folds it into per-route histograms when the response has
+# been sent. Sync routes and streaming bodies run in threadpool workers, which
+# copy the context, so they add to the same object. Work outside a request
+# (the warm-up thread, benchmarks) is not attributed to any route.
+# Values are per process; scrape each worker.
+ENABLED = os.getenv("VALENTINES_METRICS", "1") != "0"
+SLOW_LOG = slow_queries.enabled()
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+HISTOGRAMS = {
+    "valentines_http_request_duration_seconds": ("Time from request to last response byte.", SECONDS_BUCKETS),
+    "valentines_sql_duration_seconds": ("SQLite time per request, executing and fetching.", SECONDS_BUCKETS),
+    "valentines_sql_statements": ("SQL statements run per request.", STATEMENT_BUCKETS),
+    "valentines_llm_duration_seconds": ("Time waiting on the LLM per request.", SECONDS_BUCKETS),
+    "valentines_template_render_seconds": ("Jinja template render time per request.", SECONDS_BUCKETS),
+}
+COUNTERS = {
+    "valentines_http_requests_total": "Requests by route, method and status.",
+    "valentines_llm_calls_total": "LLM calls by route.",
+}
+
+_current = ContextVar("valentines_request_timings", default=None)
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class RequestTimings:
+    __slots__ = ("sql", "statements", "llm", "llm_calls", "render")
+
+    def __init__(self):
+        self.sql = 0.0
+        self.statements = 0
+        self.llm = 0.0
+        self.llm_calls = 0
+        self.render = 0.0
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Stepping happens in execute (first row) and in the fetches, so both
+    # count as SQL time. With the slow-query log on, the cursor also keeps
+    # [sql, parameters, seconds, rows] for its current statement and hands
+    # it to slow_queries once the rows have been read.
+    _statement = None
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            timings = _current.get()
+            if timings is not None:
+                timings.sql += elapsed
+            if self._statement is not None:
+                self._statement[2] += elapsed
+
+    def _finish(self, rows=0):
+        statement = self._statement
+        if statement is None:
+            return
+        self._statement = None
+        statement[3] += rows
+        if statement[2] >= slow_queries.THRESHOLD_SECONDS:
+            slow_queries.record(self.connection, *statement)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        if SLOW_LOG:
+            self._statement = [sql, parameters, 0.0, 0]
+        try:
+            self._timed(sqlite3.Cursor.execute, sql, parameters)
+        except Exception:
+            self._statement = None
+            raise
+        if self.description is None:
+            # No result set (DDL, writes): done, rows are the rows changed.
+            self._finish(max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        if SLOW_LOG:
+            seq_of_parameters = list(seq_of_parameters)
+            self._statement = [sql, seq_of_parameters[0] if seq_of_parameters else (), 0.0, 0]
+        try:
+            self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+        except Exception:
+            self._statement = None
+            raise
+        self._finish(max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        # Callers read one row and drop the cursor, so the statement ends here.
+        row = self._timed(sqlite3.Cursor.fetchone)
+        self._finish(row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(sqlite3.Cursor.fetchmany, size)
+        if self._statement is not None:
+            self._statement[3] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(sqlite3.Cursor.fetchall)
+        self._finish(len(rows))
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(sqlite3.Cursor.__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._statement is not None:
+            self._statement[3] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TimedConnection(sqlite3.Connection):
+    # Connection.execute builds a plain sqlite3.Cursor internally, so the
+    # shortcuts are rerouted through TimedCursor.
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _count_statement(sql):
+    timings = _current.get()
+    if timings is not None and not sql.startswith(slow_queries.EXPLAIN_PREFIX):
+        timings.statements += 1
+
+
+def instrument(conn):
+    # Installed by get_db: counts every statement SQLite starts, including
+    # the ones pandas and executescript run.
+    if ENABLED:
+        conn.set_trace_callback(_count_statement)
+    return conn
+
+
+def connection_factory():
+    return TimedConnection if ENABLED or SLOW_LOG else sqlite3.Connection
+
+
+@contextmanager
+def llm_timer():
+    # with llm_timer(): around one call to the model.
+    timings = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.llm += time.perf_counter() - start
+            timings.llm_calls += 1
+
+
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            timings.render += time.perf_counter() - start
+
+
+def instrument_templates(env):
+    if ENABLED:
+        env.template_class = TimedTemplate
+
+
+def _observe(name, labels, value):
+    bounds = HISTOGRAMS[name][1]
+    key = (name, labels)
+    series = _histograms.get(key)
+    if series is None:
+        series = _histograms[key] = [[0] * (len(bounds) + 1), 0, 0]
+    series[0][bisect_left(bounds, value)] += 1
+    series[1] += value
+    series[2] += 1
+
+
+def _increment(name, labels, amount=1):
+    key = (name, labels)
+    _counters[key] = _counters.get(key, 0) + amount
+
+
+def record(route, method, status, elapsed, timings):
+    with _lock:
+        _increment("valentines_http_requests_total", (("route", route), ("method", method), ("status", str(status))))
+        _observe("valentines_http_request_duration_seconds", (("route", route), ("method", method)), elapsed)
+        labels = (("route", route),)
+        _observe("valentines_sql_duration_seconds", labels, timings.sql)
+        _observe("valentines_sql_statements", labels, timings.statements)
+        _observe("valentines_template_render_seconds", labels, timings.render)
+        if timings.llm_calls:
+            _observe("valentines_llm_duration_seconds", labels, timings.llm)
+            _increment("valentines_llm_calls_total", labels, timings.llm_calls)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 9))
+    return str(value)
+
+
+def render_metrics():
+    with _lock:
+        histograms = {key: (list(counts), total, count) for key, (counts, total, count) in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (series, labels), value in sorted(counters.items()):
+            if series == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (series, labels), (counts, total, count) in sorted(histograms.items()):
+            if series != name:
+                continue
+            cumulative = 0
+            for bound, bucket in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{_labels(labels, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _route_label(scope):
+    # The route template (/api/v1/customers/{customer_id}), never the raw
+    # path, so label values stay bounded. Mounts report their prefix.
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+
+class MetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware: no extra task per request,
+    # and the timer stops after the last body chunk, so streamed exports
+    # are measured in full.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            record(_route_label(scope), scope["method"], status, elapsed, timings)
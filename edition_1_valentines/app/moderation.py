@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+from .data_loader import ensure_db
+from .db import get_db
+from .lazy import lazy_import
+from .locks import file_lock
+
+joblib = lazy_import("joblib")
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_linear = lazy_import("sklearn.linear_model")
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_PATH = BASE_DIR / "moderation_model.joblib"
+MODEL_FORMAT = 1
+MAX_BATCH_SIZE = 20000
+
+
+@dataclass
+class ModerationModel:
+    vectorizer: object
+    action_classifier: object
+    toxicity_regressor: object
+    fingerprint: str
+    trained_at: str
+    training_rows: int
+
+
+def _training_rows():
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            "SELECT message_text, moderation_action, toxicity_score "
+            "FROM trust_safety "
+            "WHERE message_text IS NOT NULL AND moderation_action IS NOT NULL "
+            "ORDER BY message_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(row[0], row[1], float(row[2] or 0.0)) for row in rows]
+
+
+def _fingerprint(rows):
+    digest = hashlib.sha1(f"format={MODEL_FORMAT}".encode("utf-8"))
+    for text, action, toxicity in rows:
+        digest.update(f"{text}\x1f{action}\x1f{toxicity}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def train_moderation_model(rows=None):
+    rows = _training_rows() if rows is None else rows
+    texts = [row[0] for row in rows]
+    actions = [row[1] for row in rows]
+    toxicity = [row[2] for row in rows]
+
+    # Character n-grams keep the model usable across the seven languages in
+    # the dataset without per-language tokenizers or stop word lists.
+    vectorizer = sklearn_text.TfidfVectorizer(
+        analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True, min_df=1
+    )
+    matrix = vectorizer.fit_transform(texts)
+
+    action_classifier = sklearn_linear.LogisticRegression(max_iter=1000, class_weight="balanced")
+    action_classifier.fit(matrix, actions)
+
+    toxicity_regressor = sklearn_linear.Ridge(alpha=1.0)
+    toxicity_regressor.fit(matrix, toxicity)
+
+    return ModerationModel(
+        vectorizer=vectorizer,
+        action_classifier=action_classifier,
+        toxicity_regressor=toxicity_regressor,
+        fingerprint=_fingerprint(rows),
+        trained_at=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        training_rows=len(rows),
+    )
+
+
+def save_moderation_model(model, path=MODEL_PATH):
+    # A temp file per process, so concurrent writers cannot interleave.
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    joblib.dump(model, tmp_path)
+    tmp_path.replace(path)
+
+
+def _load_artifact(path, fingerprint):
+    if not path.exists():
+        return None
+    try:
+        model = joblib.load(path)
+    except Exception:
+        return None
+    if not isinstance(model, ModerationModel) or model.fingerprint != fingerprint:
+        return None
+    return model
+
+
+@lru_cache(maxsize=1)
+def load_moderation_model():
+    # deploy.ps1 ships the artifact. Without one (or after the data changed)
+    # one worker trains under the lock and the others load its result.
+    rows = _training_rows()
+    fingerprint = _fingerprint(rows)
+    model = _load_artifact(MODEL_PATH, fingerprint)
+    if model is not None:
+        return model
+    with file_lock(MODEL_PATH):
+        model = _load_artifact(MODEL_PATH, fingerprint)
+        if model is None:
+            model = train_moderation_model(rows)
+            try:
+                save_moderation_model(model)
+            except OSError:
+                pass
+    return model
+
+
+def score_messages(messages):
+    if not messages:
+        return []
+
+    model = load_moderation_model()
+    texts = [message or "" for message in messages]
+    matrix = model.vectorizer.transform(texts)
+    probabilities = model.action_classifier.predict_proba(matrix)
+    toxicity = model.toxicity_regressor.predict(matrix)
+    labels = list(model.action_classifier.classes_)
+
+    best = probabilities.argmax(axis=1).tolist()
+    toxicity = toxicity.clip(0.0, 1.0).round(4).tolist()
+    probabilities = probabilities.round(4).tolist()
+    results = []
+    for idx, row in enumerate(probabilities):
+        results.append(
+            {
+                "action": labels[best[idx]],
+                "confidence": row[best[idx]],
+                "toxicity": toxicity[idx],
+                "scores": dict(zip(labels, row)),
+            }
+        )
+    return results
+
+
+def moderation_model_info():
+    model = load_moderation_model()
+    return {
+        "trained_at": model.trained_at,
+        "training_rows": model.training_rows,
+        "fingerprint": model.fingerprint[:12],
+        "labels": list(model.action_classifier.classes_),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and save the moderation model")
+    parser.add_argument("--output", default=str(MODEL_PATH))
+    args = parser.parse_args()
+
+    ensure_db()
+    model = train_moderation_model()
+    save_moderation_model(model, Path(args.output))
+    print(f"trained on {model.training_rows} rows, fingerprint {model.fingerprint[:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CHUNK_ROWS = 200000
+
+USER_ID = r"U\d+"
+IPV4 = r"(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)"
+PARTICIPANT_LIST = rf'\[\s*"{USER_ID}"(?:\s*,\s*"{USER_ID}")*\s*\]'
+
+# Per-table rules. "numeric" maps a column to its (min, max) range, either
+# bound may be None; nulls are allowed unless the column is also "required".
+# Key columns are always required and checked for duplicates across chunks.
+RULES = {
+    "dim_customer": {
+        "key": ["customer_id"],
+        "allowed": {"loyalty_tier": {"Bronze", "Silver", "Gold", "Platinum"}},
+    },
+    "dim_date": {
+        "key": ["date_id"],
+        "numeric": {
+            "date_id": (19000101, 21001231),
+            "day": (1, 31),
+            "month": (1, 12),
+            "year": (1900, 2100),
+        },
+    },
+    "dim_product": {
+        "key": ["product_id"],
+        "required": ["product_name"],
+        "numeric": {"unit_cost": (0, None), "unit_price": (0, None)},
+    },
+    "dim_promotion": {
+        "key": ["promotion_id"],
+        "numeric": {"discount_percent": (0, 100)},
+    },
+    "dim_store": {"key": ["store_id"], "required": ["channel", "country_code"]},
+    "dim_supplier": {"key": ["supplier_id"]},
+    "fact_sales": {
+        "key": ["sale_id"],
+        "required": ["product_id", "customer_id", "store_id", "date_id"],
+        "numeric": {
+            "date_id": (None, None),
+            "quantity_sold": (0, None),
+            "unit_price": (0, None),
+            "total_amount": (0, None),
+            "cost_amount": (0, None),
+        },
+        "foreign_keys": {
+            "product_id": ("dim_product", "product_id"),
+            "customer_id": ("dim_customer", "customer_id"),
+            "store_id": ("dim_store", "store_id"),
+            "promotion_id": ("dim_promotion", "promotion_id"),
+            "supplier_id": ("dim_supplier", "supplier_id"),
+            "date_id": ("dim_date", "date_id"),
+        },
+    },
+    "gift_recommender": {
+        "key": ["event_id"],
+        "required": ["customer_id", "product_name"],
+        "numeric": {
+            "list_price": (0, None),
+            "discount_pct": (0, 1),
+            "unit_price": (0, None),
+            "rating": (1, 5),
+        },
+        "foreign_keys": {"customer_id": ("dim_customer", "customer_id")},
+    },
+    "supply_chain": {
+        "key": ["order_id"],
+        "required": ["product_id", "vendor_lead_time_days", "stock_level"],
+        "numeric": {
+            "vendor_lead_time_days": (0, None),
+            "stock_level": (0, None),
+            "order_quantity": (0, None),
+            "cost_per_unit": (0, None),
+            "sustainability_score": (0, 1),
+        },
+        "foreign_keys": {"product_id": ("dim_product", "product_id")},
+    },
+    "matchmaking": {
+        "key": ["user_id"],
+        "required": [
+            "openness",
+            "conscientiousness",
+            "extraversion",
+            "agreeableness",
+            "neuroticism",
+        ],
+        "patterns": {"user_id": USER_ID},
+        "numeric": {
+            "age": (18, 120),
+            "openness": (0, 1),
+            "conscientiousness": (0, 1),
+            "extraversion": (0, 1),
+            "agreeableness": (0, 1),
+            "neuroticism": (0, 1),
+        },
+    },
+    "behavior_edges": {
+        "key": ["edge_id"],
+        "patterns": {"source_user_id": USER_ID, "target_user_id": USER_ID},
+        "numeric": {"weight": (0, 1), "probability": (0, 1)},
+    },
+    "broken_hearts_security": {
+        "key": ["security_audit_id"],
+        "required": ["user_id", "ip_address", "timestamp"],
+        "patterns": {
+            "login_attempt_id": r"L\d+",
+            "user_id": USER_ID,
+            "ip_address": IPV4,
+        },
+        "numeric": {"failed_attempts": (0, None), "risk_score": (0, 10)},
+        "timestamps": ["timestamp"],
+    },
+    "trust_safety": {
+        "key": ["message_id"],
+        "required": ["message_text", "moderation_action"],
+        "numeric": {"toxicity_score": (0, 1)},
+        "allowed": {"moderation_action": {"allow", "review", "block"}},
+    },
+    "global_routing": {
+        "key": ["routing_id"],
+        "required": ["region"],
+        "numeric": {
+            "request_count_per_min": (0, None),
+            "p95_latency_ms": (0, None),
+            "failure_rate": (0, 1),
+        },
+    },
+    "love_notes_telemetry": {
+        "key": ["message_id"],
+        "required": ["region_destination", "latency_ms", "delivery_status"],
+        "numeric": {
+            "latency_ms": (0, None),
+            "retry_count": (0, None),
+            "network_speed_mbps": (0, None),
+        },
+        "timestamps": ["timestamp"],
+    },
+    "work_dynamics": {
+        "key": ["event_id"],
+        "required": ["meeting_id", "participant_ids"],
+        "patterns": {"meeting_id": r"MTG\d+", "participant_ids": PARTICIPANT_LIST},
+        "allowed": {
+            "response_pattern": {"accepted", "declined", "tentative", "ghosted"},
+            "cross_timezone_issues": {"True", "False", "true", "false"},
+        },
+        "numeric": {"sentiment_of_notes": (-1, 1), "action_items_completed": (0, None)},
+    },
+}
+
+
+def quarantine_table(table_name):
+    return f"quarantine_{table_name}"
+
+
+class QualityGate:
+    def __init__(self, table_name, parent_keys):
+        self.table_name = table_name
+        self.rules = RULES.get(table_name, {})
+        self.parent_keys = parent_keys
+        # Sorted uint64 hashes of every accepted key so far: 8 bytes a row,
+        # checked and extended with array operations.
+        self.seen_keys = np.empty(0, dtype=np.uint64)
+        self.rejected = 0
+        self.reasons = {}
+
+    def _checks(self, chunk):
+        # Ordered (mask, reason) pairs; the first failing check names the row.
+        rules = self.rules
+        checks = []
+        nulls = {}
+
+        def isna(column):
+            if column not in nulls:
+                nulls[column] = chunk[column].isna().to_numpy()
+            return nulls[column]
+
+        key = [column for column in rules.get("key", []) if column in chunk]
+        required = key + [
+            column for column in rules.get("required", []) if column in chunk
+        ]
+        for column in required:
+            checks.append((isna(column), f"missing:{column}"))
+
+        converted = {}
+        for column, (low, high) in rules.get("numeric", {}).items():
+            if column not in chunk:
+                continue
+            values = chunk[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values, errors="coerce")
+                converted[column] = values
+                checks.append((values.isna().to_numpy() & ~isna(column), f"invalid_type:{column}"))
+            array = values.to_numpy()
+            out_of_range = np.zeros(len(chunk), dtype=bool)
+            if low is not None:
+                out_of_range |= array < low
+            if high is not None:
+                out_of_range |= array > high
+            checks.append((out_of_range, f"out_of_range:{column}"))
+
+        for column in rules.get("timestamps", []):
+            if column not in chunk:
+                continue
+            parsed = pd.to_datetime(chunk[column], errors="coerce", utc=True, format="ISO8601")
+            checks.append((parsed.isna().to_numpy() & ~isna(column), f"invalid_timestamp:{column}"))
+
+        for column, pattern in rules.get("patterns", {}).items():
+            if column not in chunk:
+                continue
+            matches = chunk[column].astype("string").str.fullmatch(pattern)
+            checks.append(
+                (~matches.fillna(False).to_numpy(dtype=bool) & ~isna(column), f"bad_format:{column}")
+            )
+
+        for column, allowed in rules.get("allowed", {}).items():
+            if column not in chunk:
+                continue
+            values = chunk[column].astype("string")
+            checks.append(
+                (~values.isin(allowed).to_numpy(dtype=bool) & ~isna(column), f"not_allowed:{column}")
+            )
+
+        for column, (parent_table, parent_column) in rules.get("foreign_keys", {}).items():
+            if column not in chunk:
+                continue
+            parents = self.parent_keys(parent_table, parent_column)
+            if parents is None:
+                continue
+            values = converted.get(column, chunk[column])
+            checks.append((~values.isin(parents).to_numpy() & ~isna(column), f"unknown_fk:{column}"))
+
+        hashes = None
+        if key:
+            hashes = pd.util.hash_pandas_object(chunk[key], index=False, categorize=False).to_numpy()
+            duplicate = pd.Series(hashes).duplicated().to_numpy()
+            seen = self.seen_keys
+            if len(seen):
+                positions = np.searchsorted(seen, hashes)
+                duplicate = duplicate | (seen[np.minimum(positions, len(seen) - 1)] == hashes)
+            checks.append((duplicate, "duplicate_key"))
+
+        return checks, converted, hashes
+
+    def check(self, chunk):
+        if not self.rules or chunk.empty:
+            return chunk, chunk.iloc[0:0]
+
+        checks, converted, hashes = self._checks(chunk)
+        reasons = np.select(
+            [mask for mask, _ in checks], [reason for _, reason in checks], default=""
+        )
+        rejected_mask = reasons != ""
+        accepted = ~rejected_mask
+
+        if hashes is not None:
+            # Accepted hashes are unique and not yet seen, so a sorted insert
+            # keeps the array sorted and duplicate-free.
+            added = np.sort(hashes[accepted])
+            self.seen_keys = np.insert(self.seen_keys, np.searchsorted(self.seen_keys, added), added)
+
+        valid = chunk.assign(**converted) if converted else chunk
+        if not rejected_mask.any():
+            return valid, chunk.iloc[0:0]
+
+        valid = valid.loc[accepted]
+        rejected = chunk.loc[rejected_mask].copy()
+        rejected["reason"] = reasons[rejected_mask]
+        self.rejected += len(rejected)
+        for reason, count in rejected["reason"].value_counts().items():
+            self.reasons[reason] = self.reasons.get(reason, 0) + int(count)
+        return valid, rejected
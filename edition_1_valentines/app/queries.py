@@ -1,4 +1,7 @@
+import base64
+import json
 from collections import Counter
+from datetime import date
 from math import sqrt
 
 from .ai import (
@@ -8,48 +11,103 @@ from .ai import (
     generate_sales_chat_response,
     semantic_search,
 )
+from .cache import shared_cache
 from .db import get_db
+from .rollups import window_comparison
+from .sales_sample import STRATA_SQL, estimate_summary
+from .telemetry import destination_stats
 
 
-def list_customers(limit=50):
-    conn = get_db()
+# Paged lists are ordered by a unique key and continue with "key > last
+# key seen", so every page is one index range scan of LIMIT rows no matter
+# how deep it is. The cursor is that last key, opaque to callers.
+COUNTED_TABLES = {"dim_customer", "dim_product", "matchmaking"}
+
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    # Unreadable cursors start again from the first page.
+    if not cursor:
+        return None
     try:
-        rows = conn.execute(
-            "SELECT customer_id, first_name, last_name, loyalty_tier "
-            "FROM dim_customer ORDER BY customer_id LIMIT ?",
-            (limit,),
-        ).fetchall()
-        return rows
-    finally:
-        conn.close()
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
 
+def _page(rows, limit, key):
+    # One extra row is fetched to tell whether another page exists.
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
 
-def list_products(limit=50):
+
+def _list_page(table, columns, key, limit, after):
+    after_key = decode_cursor(after, 1)
+    where_sql = ""
+    params = []
+    if after_key:
+        where_sql = f"WHERE {key} > ? "
+        params.append(after_key[0])
     conn = get_db()
     try:
         rows = conn.execute(
-            "SELECT product_id, product_name, unit_price, category "
-            "FROM dim_product ORDER BY product_id LIMIT ?",
-            (limit,),
+            f"SELECT {columns} FROM {table} {where_sql}ORDER BY {key} LIMIT ?",
+            (*params, limit + 1),
         ).fetchall()
-        return rows
     finally:
         conn.close()
+    return _page(rows, limit, lambda row: (row[key],))
 
 
-def list_matchmaking_users(limit=50):
+@shared_cache()
+def count_rows(table):
+    if table not in COUNTED_TABLES:
+        raise ValueError(f"Unknown table: {table}")
     conn = get_db()
     try:
-        rows = conn.execute(
-            "SELECT user_id, age, location_region "
-            "FROM matchmaking ORDER BY user_id LIMIT ?",
-            (limit,),
-        ).fetchall()
-        return rows
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
     finally:
         conn.close()
 
 
+def list_customers(limit=50, after=None):
+    return _list_page(
+        "dim_customer",
+        "customer_id, first_name, last_name, loyalty_tier",
+        "customer_id",
+        limit,
+        after,
+    )
+
+
+def list_products(limit=50, after=None):
+    return _list_page(
+        "dim_product",
+        "product_id, product_name, unit_price, category",
+        "product_id",
+        limit,
+        after,
+    )
+
+
+def list_matchmaking_users(limit=50, after=None):
+    return _list_page(
+        "matchmaking",
+        "user_id, age, location_region",
+        "user_id",
+        limit,
+        after,
+    )
+
+
 def love_letter_data(customer_id):
     conn = get_db()
     try:
@@ -323,6 +381,7 @@ def compatibility_score(user_a, user_b):
     }
 
 
+@shared_cache()
 def sales_overview():
     conn = get_db()
     try:
@@ -331,15 +390,14 @@ def sales_overview():
             "SUM(total_amount) AS revenue, "
             "SUM(total_amount - cost_amount) AS profit, "
             "AVG(total_amount) AS avg_order "
-            "FROM fact_sales"
+            "FROM sales_wide"
         ).fetchone()
 
         top_products = conn.execute(
-            "SELECT dp.product_name, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.quantity_sold) AS units "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "GROUP BY dp.product_name "
+            "SELECT product_name, SUM(total_amount) AS revenue, "
+            "SUM(quantity_sold) AS units "
+            "FROM sales_wide "
+            "GROUP BY product_name "
             "ORDER BY revenue DESC LIMIT 5"
         ).fetchall()
         return summary, top_products
@@ -347,9 +405,100 @@ def sales_overview():
         conn.close()
 
 
-def _sales_filters(filters):
+# Named periods resolve against dim_date like any other date filter.
+# Rolling windows end at the latest day with sales, not at today.
+SALES_PERIODS = {
+    "valentine-week": ("Valentine week (Feb 8-14)", "strftime('%m-%d', full_date) BETWEEN '02-08' AND '02-14'"),
+    "valentines-day": ("Valentine's Day", "strftime('%m-%d', full_date) = '02-14'"),
+    "holidays": ("Holidays", "is_holiday = 1"),
+    "last-7-days": ("Last 7 days", 7),
+    "last-30-days": ("Last 30 days", 30),
+    "last-90-days": ("Last 90 days", 90),
+}
+
+
+def _iso_date(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+@shared_cache()
+def resolve_date_ids(start=None, end=None, season=None, period=None):
+    # Turns calendar filters into runs of consecutive dim_date rows, so the
+    # sales query filters on date_id alone: one BETWEEN per run, or an IN
+    # list for isolated days. Returns None when no date filter applies.
     clauses = []
     params = []
+    if start:
+        clauses.append("full_date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("full_date <= ?")
+        params.append(end)
+    if season:
+        clauses.append("season = ?")
+        params.append(season)
+    if period:
+        rule = SALES_PERIODS[period][1]
+        if isinstance(rule, int):
+            clauses.append(
+                "full_date > date((SELECT full_date FROM dim_date "
+                "WHERE date_id = (SELECT MAX(date_id) FROM sales_wide)), ?) "
+                "AND date_id <= (SELECT MAX(date_id) FROM sales_wide)"
+            )
+            params.append(f"-{rule} days")
+        else:
+            clauses.append(rule)
+    if not clauses:
+        return None
+
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            f"SELECT date_id, ({' AND '.join(clauses)}) AS matched "
+            "FROM dim_date ORDER BY date_id",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return _date_runs(rows)
+
+
+def _date_runs(rows):
+    runs = []
+    current = None
+    for row in rows:
+        if row["matched"]:
+            if current is None:
+                current = [row["date_id"], row["date_id"]]
+                runs.append(current)
+            else:
+                current[1] = row["date_id"]
+        else:
+            current = None
+    return [tuple(run) for run in runs]
+
+
+def _date_id_clause(runs):
+    if not runs:
+        return "0 = 1", []
+    ranges = [run for run in runs if run[0] != run[1]]
+    days = [run[0] for run in runs if run[0] == run[1]]
+    parts = ["date_id BETWEEN ? AND ?" for _ in ranges]
+    params = [value for run in ranges for value in run]
+    if days:
+        parts.append(f"date_id IN ({', '.join('?' for _ in days)})")
+        params.extend(days)
+    return "(" + " OR ".join(parts) + ")", params
+
+
+def _sales_filters(filters, *extra_clauses):
+    # Predicates on sales_wide columns; extra clauses are ANDed in as-is.
+    clauses = list(extra_clauses)
+    params = []
 
     category = filters.get("category")
     channel = filters.get("channel")
@@ -357,20 +506,32 @@ def _sales_filters(filters):
     month = filters.get("month")
 
     if category:
-        clauses.append("dp.category = ?")
+        clauses.append("category = ?")
         params.append(category)
     if channel:
-        clauses.append("ds.channel = ?")
+        clauses.append("channel = ?")
         params.append(channel)
     if country:
-        clauses.append("ds.country_code = ?")
+        clauses.append("country_code = ?")
         params.append(country)
     if month and "-" in month:
         year_str, month_str = month.split("-", 1)
         if year_str.isdigit() and month_str.isdigit():
-            clauses.append("dd.year = ? AND dd.month = ?")
+            clauses.append("year = ? AND month = ?")
             params.extend([int(year_str), int(month_str)])
 
+    period = filters.get("period")
+    runs = resolve_date_ids(
+        _iso_date(filters.get("start")),
+        _iso_date(filters.get("end")),
+        filters.get("season") or None,
+        period if period in SALES_PERIODS else None,
+    )
+    if runs is not None:
+        date_sql, date_params = _date_id_clause(runs)
+        clauses.append(date_sql)
+        params.extend(date_params)
+
     where_sql = ""
     if clauses:
         where_sql = "WHERE " + " AND ".join(clauses)
@@ -378,6 +539,7 @@ def _sales_filters(filters):
     return where_sql, params
 
 
+@shared_cache()
 def sales_filter_options():
     conn = get_db()
     try:
@@ -396,43 +558,68 @@ def sales_filter_options():
                 "SELECT DISTINCT year, month FROM dim_date ORDER BY year, month"
             ).fetchall()
         ]
+        seasons = [row[0] for row in conn.execute(
+            "SELECT DISTINCT season FROM dim_date ORDER BY season"
+        ).fetchall()]
         return {
             "categories": categories,
             "channels": channels,
             "countries": countries,
             "months": months,
+            "seasons": seasons,
         }
     finally:
         conn.close()
 
 
-def sales_overview_filtered(filters):
+def _sample_summary(conn, filters):
+    # Strata are (country, category), so only those two filters decide which
+    # strata can hold matching rows; the rest only pick rows within them.
+    where_sql, params = _sales_filters(filters)
+    strata_where, strata_params = _sales_filters(
+        {"country": filters.get("country"), "category": filters.get("category")}
+    )
+    sql = STRATA_SQL.format(where_sql=where_sql, strata_where=strata_where)
+    return estimate_summary(conn.execute(sql, [*strata_params, *params]).fetchall())
+
+
+@shared_cache()
+def sales_overview_filtered(filters, approximate=False):
+    # approximate=True reads the stratified sales_sample instead: totals are
+    # scaled by each row's weight and the summary carries 95% margins.
     conn = get_db()
     try:
         where_sql, params = _sales_filters(filters)
 
+        if approximate:
+            summary = _sample_summary(conn, filters)
+            top_products = conn.execute(
+                "SELECT product_name, SUM(total_amount * weight) AS revenue, "
+                "CAST(ROUND(SUM(quantity_sold * weight)) AS INTEGER) AS units "
+                "FROM sales_sample "
+                f"{where_sql} "
+                "GROUP BY product_name "
+                "ORDER BY revenue DESC LIMIT 5",
+                params,
+            ).fetchall()
+            return summary, top_products
+
         summary = conn.execute(
             "SELECT COUNT(*) AS orders, "
-            "SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, "
-            "AVG(fs.total_amount) AS avg_order "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            "SUM(total_amount) AS revenue, "
+            "SUM(total_amount - cost_amount) AS profit, "
+            "AVG(total_amount) AS avg_order "
+            "FROM sales_wide "
             f"{where_sql}",
             params,
         ).fetchone()
 
         top_products = conn.execute(
-            "SELECT dp.product_name, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.quantity_sold) AS units "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            "SELECT product_name, SUM(total_amount) AS revenue, "
+            "SUM(quantity_sold) AS units "
+            "FROM sales_wide "
             f"{where_sql} "
-            "GROUP BY dp.product_name "
+            "GROUP BY product_name "
             "ORDER BY revenue DESC LIMIT 5",
             params,
         ).fetchall()
@@ -441,126 +628,213 @@ def sales_overview_filtered(filters):
         conn.close()
 
 
-def sales_all_products(filters):
+def sales_all_products(filters, limit=None, after=None):
+    # Sorted by revenue descending, then product name, which is unique per
+    # group. The cursor filters groups after aggregation, so a deep page
+    # costs the same single aggregate as the first one.
     conn = get_db()
     try:
         where_sql, params = _sales_filters(filters)
+        having_sql = ""
+        after_key = decode_cursor(after, 2)
+        if after_key:
+            having_sql = "HAVING revenue < ? OR (revenue = ? AND product_name > ?) "
+            params = [*params, after_key[0], after_key[0], after_key[1]]
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = " LIMIT ?"
+            params = [*params, limit + 1]
         rows = conn.execute(
-            "SELECT dp.product_name, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, "
-            "SUM(fs.quantity_sold) AS units "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            "SELECT product_name, TOTAL(total_amount) AS revenue, "
+            "SUM(total_amount - cost_amount) AS profit, "
+            "SUM(quantity_sold) AS units "
+            "FROM sales_wide "
             f"{where_sql} "
-            "GROUP BY dp.product_name "
-            "ORDER BY revenue DESC"
-        , params).fetchall()
-        return rows
+            "GROUP BY product_name "
+            f"{having_sql}"
+            "ORDER BY revenue DESC, product_name"
+            f"{limit_sql}",
+            params,
+        ).fetchall()
+        return _page(rows, limit, lambda row: (row["revenue"], row["product_name"]))
     finally:
         conn.close()
 
 
-def sales_chat_context(filters):
+@shared_cache()
+def sales_product_count(filters):
     conn = get_db()
     try:
         where_sql, params = _sales_filters(filters)
-        summary = conn.execute(
-            "SELECT COUNT(*) AS orders, "
-            "SUM(total_amount) AS revenue, "
-            "SUM(total_amount - cost_amount) AS profit, "
-            "AVG(total_amount) AS avg_order "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+        return conn.execute(
+            "SELECT COUNT(DISTINCT product_name) "
+            "FROM sales_wide "
             f"{where_sql}",
             params,
-        ).fetchone()
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+@shared_cache()
+def sales_dashboard_snapshot(filters, approximate=False):
+    # One pass over the filtered join, grouped by product. The summary is
+    # the sum of the groups and the top products are the head of the list,
+    # so the dashboard no longer joins fact_sales three times. In
+    # approximate mode the groups are weighted sums over sales_sample and
+    # the summary is the stratified estimate.
+    conn = get_db()
+    try:
+        where_sql, params = _sales_filters(filters)
+        if approximate:
+            summary = _sample_summary(conn, filters)
+            rows = conn.execute(
+                "SELECT product_name, TOTAL(total_amount * weight) AS revenue, "
+                "TOTAL((total_amount - cost_amount) * weight) AS profit, "
+                "CAST(ROUND(TOTAL(quantity_sold * weight)) AS INTEGER) AS units "
+                "FROM sales_sample "
+                f"{where_sql} "
+                "GROUP BY product_name "
+                "ORDER BY revenue DESC, product_name",
+                params,
+            ).fetchall()
+            products = [dict(row) for row in rows]
+            return {"summary": summary, "top_products": products[:5], "products": products}
+
+        rows = conn.execute(
+            "SELECT product_name, COUNT(*) AS orders, "
+            "COUNT(total_amount) AS priced_orders, "
+            "TOTAL(total_amount) AS revenue, "
+            "SUM(total_amount - cost_amount) AS profit, "
+            "SUM(quantity_sold) AS units "
+            "FROM sales_wide "
+            f"{where_sql} "
+            "GROUP BY product_name "
+            "ORDER BY revenue DESC, product_name",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+
+    products = [
+        {
+            "product_name": row["product_name"],
+            "revenue": row["revenue"],
+            "profit": row["profit"],
+            "units": row["units"],
+        }
+        for row in rows
+    ]
+    priced_orders = sum(row["priced_orders"] for row in rows)
+    revenue = sum(row["revenue"] for row in rows) if priced_orders else None
+    profits = [row["profit"] for row in rows if row["profit"] is not None]
+    summary = {
+        "orders": sum(row["orders"] for row in rows),
+        "revenue": revenue,
+        "profit": sum(profits) if profits else None,
+        "avg_order": revenue / priced_orders if priced_orders else None,
+    }
+    return {"summary": summary, "top_products": products[:5], "products": products}
+
+
+def sales_products_page(products, limit, after=None):
+    # Same cursor and sort contract as sales_all_products, applied to the
+    # snapshot's product list.
+    after_key = decode_cursor(after, 2)
+    if after_key:
+        revenue, name = after_key
+        products = [
+            row
+            for row in products
+            if row["revenue"] < revenue
+            or (row["revenue"] == revenue and row["product_name"] > name)
+        ]
+    return _page(products[: limit + 1], limit, lambda row: (row["revenue"], row["product_name"]))
+
+
+def sales_chat_context(filters, approximate=False):
+    # The approximate context runs the same breakdowns over sales_sample,
+    # scaling sums and counts by the row weight.
+    source, weight, orders_sql = "sales_wide", "", "COUNT(*)"
+    if approximate:
+        source, weight, orders_sql = "sales_sample", " * weight", "CAST(ROUND(SUM(weight)) AS INTEGER)"
+    conn = get_db()
+    try:
+        where_sql, params = _sales_filters(filters)
+        # sales_wide keeps sales without a promotion; they have no promo row.
+        promo_where_sql, _ = _sales_filters(filters, "promotion_id IS NOT NULL")
+        if approximate:
+            summary = _sample_summary(conn, filters)
+        else:
+            summary = conn.execute(
+                "SELECT COUNT(*) AS orders, "
+                "SUM(total_amount) AS revenue, "
+                "SUM(total_amount - cost_amount) AS profit, "
+                "AVG(total_amount) AS avg_order "
+                "FROM sales_wide "
+                f"{where_sql}",
+                params,
+            ).fetchone()
 
         by_category = conn.execute(
-            "SELECT dp.category, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            f"SELECT category, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY dp.category "
+            "GROUP BY category "
             "ORDER BY revenue DESC LIMIT 8"
         , params).fetchall()
 
         by_channel = conn.execute(
-            "SELECT ds.channel, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, COUNT(*) AS orders "
-            "FROM fact_sales fs "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            f"SELECT channel, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, {orders_sql} AS orders "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY ds.channel ORDER BY revenue DESC"
+            "GROUP BY channel ORDER BY revenue DESC"
         , params).fetchall()
 
         by_country = conn.execute(
-            "SELECT ds.country_code, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, COUNT(*) AS orders "
-            "FROM fact_sales fs "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            f"SELECT country_code, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, {orders_sql} AS orders "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY ds.country_code ORDER BY revenue DESC LIMIT 8"
+            "GROUP BY country_code ORDER BY revenue DESC LIMIT 8"
         , params).fetchall()
 
         by_month = conn.execute(
-            "SELECT dd.year, dd.month, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, COUNT(*) AS orders "
-            "FROM fact_sales fs "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
+            f"SELECT year, month, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, {orders_sql} AS orders "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY dd.year, dd.month ORDER BY dd.year, dd.month"
+            "GROUP BY year, month ORDER BY year, month"
         , params).fetchall()
 
         by_promo = conn.execute(
-            "SELECT dpromo.promo_name, dpromo.promo_channel, "
-            "AVG(dpromo.discount_percent) AS discount_pct, "
-            "SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, COUNT(*) AS orders "
-            "FROM fact_sales fs "
-            "JOIN dim_promotion dpromo ON fs.promotion_id = dpromo.promotion_id "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
-            f"{where_sql} "
-            "GROUP BY dpromo.promo_name, dpromo.promo_channel "
+            "SELECT promo_name, promo_channel, "
+            "AVG(discount_percent) AS discount_pct, "
+            f"SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, {orders_sql} AS orders "
+            f"FROM {source} "
+            f"{promo_where_sql} "
+            "GROUP BY promo_name, promo_channel "
             "ORDER BY revenue DESC LIMIT 8"
         , params).fetchall()
 
         by_loyalty = conn.execute(
-            "SELECT dc.loyalty_tier, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, COUNT(*) AS orders "
-            "FROM fact_sales fs "
-            "JOIN dim_customer dc ON fs.customer_id = dc.customer_id "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            f"SELECT loyalty_tier, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, {orders_sql} AS orders "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY dc.loyalty_tier ORDER BY revenue DESC"
+            "GROUP BY loyalty_tier ORDER BY revenue DESC"
         , params).fetchall()
 
         top_products = conn.execute(
-            "SELECT dp.product_name, SUM(fs.total_amount) AS revenue, "
-            "SUM(fs.total_amount - fs.cost_amount) AS profit, "
-            "SUM(fs.quantity_sold) AS units "
-            "FROM fact_sales fs "
-            "JOIN dim_product dp ON fs.product_id = dp.product_id "
-            "JOIN dim_store ds ON fs.store_id = ds.store_id "
-            "JOIN dim_date dd ON fs.date_id = dd.date_id "
+            f"SELECT product_name, SUM(total_amount{weight}) AS revenue, "
+            f"SUM((total_amount - cost_amount){weight}) AS profit, "
+            f"SUM(quantity_sold{weight}) AS units "
+            f"FROM {source} "
             f"{where_sql} "
-            "GROUP BY dp.product_name ORDER BY revenue DESC LIMIT 8"
+            "GROUP BY product_name ORDER BY revenue DESC LIMIT 8"
         , params).fetchall()
 
         def to_dicts(rows):
@@ -580,34 +854,91 @@ def sales_chat_context(filters):
         conn.close()
 
 
-def sales_chat_answer(question, filters):
-    context = sales_chat_context(filters)
+def sales_chat_answer(question, filters, approximate=False):
+    context = sales_chat_context(filters, approximate)
     response, source, error = generate_sales_chat_response(question, context)
     return response, source, error
 
 
+@shared_cache()
 def global_love_metrics():
+    delivery = destination_stats()
+
     conn = get_db()
     try:
-        delivery = conn.execute(
-            "SELECT region_destination, "
-            "AVG(latency_ms) AS avg_latency, "
-            "AVG(CASE WHEN delivery_status = 'delivered' THEN 1.0 ELSE 0.0 END) "
-            "AS success_rate "
-            "FROM love_notes_telemetry "
-            "GROUP BY region_destination "
-            "ORDER BY avg_latency DESC"
-        ).fetchall()
-
         routing = conn.execute(
             "SELECT region, request_count_per_min, p95_latency_ms, failure_rate "
             "FROM global_routing ORDER BY failure_rate DESC LIMIT 5"
         ).fetchall()
-        return delivery, routing
+    finally:
+        conn.close()
+
+    windows = {
+        "delivery": window_comparison("love_notes"),
+        "routing": window_comparison("routing"),
+    }
+    return delivery, routing, windows
+
+
+def participant_analytics(limit=50):
+    conn = get_db()
+    try:
+        participants = conn.execute(
+            "SELECT user_id, meetings, events, cross_timezone_events, "
+            "cross_timezone_rate, avg_sentiment, action_items_completed "
+            "FROM participant_load "
+            "ORDER BY meetings DESC, user_id LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+        totals = conn.execute(
+            "SELECT COUNT(*) AS participants, "
+            "(SELECT COUNT(DISTINCT meeting_id) FROM meeting_participant) AS meetings, "
+            "(SELECT COUNT(*) FROM quarantine_work_dynamics) AS quarantined "
+            "FROM participant_load"
+        ).fetchone()
+
+        reasons = conn.execute(
+            "SELECT reason, COUNT(*) AS rows "
+            "FROM quarantine_work_dynamics GROUP BY reason ORDER BY rows DESC"
+        ).fetchall()
+        return participants, totals, reasons
+    finally:
+        conn.close()
+
+
+def participant_meetings(user_id):
+    conn = get_db()
+    try:
+        profile = conn.execute(
+            "SELECT user_id, meetings, events, cross_timezone_events, "
+            "cross_timezone_rate, avg_sentiment, action_items_completed "
+            "FROM participant_load WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+
+        meetings = conn.execute(
+            "SELECT mp.meeting_id, COUNT(other.user_id) AS participants "
+            "FROM meeting_participant mp "
+            "JOIN meeting_participant other ON other.meeting_id = mp.meeting_id "
+            "WHERE mp.user_id = ? "
+            "GROUP BY mp.meeting_id ORDER BY mp.meeting_id",
+            (user_id,),
+        ).fetchall()
+        return profile, meetings
     finally:
         conn.close()
 
 
+def supply_chain_risk(row):
+    lead_time = float(row["vendor_lead_time_days"])
+    stock = float(row["stock_level"])
+    delay_penalty = 5.0 if row["delay_reason"] != "none" else 0.0
+    stock_risk = max(0.0, (500.0 - stock) / 500.0) * 30.0
+    return round(lead_time * 0.7 + stock_risk + delay_penalty, 2)
+
+
+@shared_cache()
 def supply_chain_alerts(limit=10):
     conn = get_db()
     try:
@@ -620,14 +951,7 @@ def supply_chain_alerts(limit=10):
     finally:
         conn.close()
 
-    alerts = []
-    for row in rows:
-        lead_time = float(row["vendor_lead_time_days"])
-        stock = float(row["stock_level"])
-        delay_penalty = 5.0 if row["delay_reason"] != "none" else 0.0
-        stock_risk = max(0.0, (500.0 - stock) / 500.0) * 30.0
-        score = lead_time * 0.7 + stock_risk + delay_penalty
-        alerts.append({"row": row, "risk": round(score, 2)})
+    alerts = [{"row": row, "risk": supply_chain_risk(row)} for row in rows]
 
     alerts.sort(key=lambda item: item["risk"], reverse=True)
     return alerts[:limit]
@@ -691,16 +1015,7 @@ def _supply_chain_risk_map():
     finally:
         conn.close()
 
-    risk_map = {}
-    for row in rows:
-        lead_time = float(row["vendor_lead_time_days"])
-        stock = float(row["stock_level"])
-        delay_penalty = 5.0 if row["delay_reason"] != "none" else 0.0
-        stock_risk = max(0.0, (500.0 - stock) / 500.0) * 30.0
-        score = lead_time * 0.7 + stock_risk + delay_penalty
-        risk_map[row["product_name"]] = round(score, 2)
-
-    return risk_map
+    return {row["product_name"]: supply_chain_risk(row) for row in rows}
 
 
 def _delivery_metrics(region):
@@ -713,9 +1028,9 @@ def _delivery_metrics(region):
         ).fetchone()
 
         success = conn.execute(
-            "SELECT AVG(CASE WHEN delivery_status = 'delivered' THEN 1.0 ELSE 0.0 END) "
-            "AS success_rate "
-            "FROM love_notes_telemetry WHERE region_destination = ?",
+            "SELECT CAST(delivered AS REAL) / events AS success_rate "
+            "FROM love_notes_destination_stats "
+            "WHERE region_destination = ? AND events > 0",
             (region,),
         ).fetchone()
     finally:
@@ -808,6 +1123,7 @@ def order_quote(product_id, quantity, loyalty_tier):
     }
 
 
+@shared_cache()
 def analytics_overview():
     conn = get_db()
     try:
@@ -839,3 +1155,31 @@ def analytics_overview():
         return counts, scores
     finally:
         conn.close()
+
+
+def quarantine_summary():
+    conn = get_db()
+    try:
+        tables = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name LIKE 'quarantine_%' ORDER BY name"
+            ).fetchall()
+        ]
+        summary = []
+        for table in tables:
+            rows = conn.execute(
+                f"SELECT reason, COUNT(*) AS rows FROM {table} "
+                "GROUP BY reason ORDER BY rows DESC"
+            ).fetchall()
+            summary.append(
+                {
+                    "table": table[len("quarantine_"):],
+                    "rows": sum(row["rows"] for row in rows),
+                    "reasons": rows,
+                }
+            )
+        return summary
+    finally:
+        conn.close()
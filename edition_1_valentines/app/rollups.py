@@ -0,0 +1,376 @@
+import math
+from datetime import datetime, timezone
+
+from .cache import bump_version
+from .db import get_db, get_write_db
+from .sketch import LatencySketch
+
+GRANULARITIES = {"minute": 60, "hour": 3600}
+
+# Retention and query windows are measured from the wall clock. Samples
+# older than the hour retention or more than MAX_FUTURE_SECONDS ahead of now
+# (clock skew) are dropped before they reach a bucket, so one bad timestamp,
+# such as epoch milliseconds, cannot push every other bucket out of
+# retention.
+RETENTION_SECONDS = {"minute": 6 * 3600, "hour": 30 * 24 * 3600}
+MAX_FUTURE_SECONDS = 300
+
+ROLLUP_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS metric_rollups ("
+    "metric TEXT NOT NULL, "
+    "region TEXT NOT NULL, "
+    "granularity TEXT NOT NULL, "
+    "bucket_start INTEGER NOT NULL, "
+    "samples INTEGER NOT NULL, "
+    "events INTEGER NOT NULL, "
+    "successes INTEGER NOT NULL, "
+    "value_sum REAL NOT NULL, "
+    "value_max REAL, "
+    "sketch TEXT NOT NULL, "
+    "PRIMARY KEY (metric, granularity, bucket_start, region)"
+    ") WITHOUT ROWID"
+)
+
+
+def ensure_rollup_tables(conn):
+    conn.execute(ROLLUP_TABLE_SQL)
+
+
+def parse_timestamp(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _now():
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def plausible_timestamp(ts, now=None):
+    now = _now() if now is None else now
+    return now - RETENTION_SECONDS["hour"] <= ts <= now + MAX_FUTURE_SECONDS
+
+
+def _window_start(granularity, seconds, now):
+    # Buckets after this one make up the last `seconds`, current bucket
+    # included.
+    width = GRANULARITIES[granularity]
+    return now - now % width + width - seconds
+
+
+def _format_epoch(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _compact(samples):
+    partials = {}
+    for sample in samples:
+        ts = sample["ts"]
+        for granularity, width in GRANULARITIES.items():
+            key = (sample["region"], granularity, ts - ts % width)
+            partial = partials.get(key)
+            if partial is None:
+                partial = {
+                    "samples": 0,
+                    "events": 0,
+                    "successes": 0,
+                    "value_sum": 0.0,
+                    "value_max": None,
+                    "sketch": LatencySketch(),
+                }
+                partials[key] = partial
+
+            value = sample["value"]
+            partial["samples"] += 1
+            partial["events"] += sample["events"]
+            partial["successes"] += sample["successes"]
+            partial["value_sum"] += value
+            if partial["value_max"] is None or value > partial["value_max"]:
+                partial["value_max"] = value
+            partial["sketch"].add(value)
+    return partials
+
+
+def _merge_buckets(conn, metric, partials):
+    for (region, granularity, bucket_start), partial in partials.items():
+        row = conn.execute(
+            "SELECT samples, events, successes, value_sum, value_max, sketch "
+            "FROM metric_rollups "
+            "WHERE metric = ? AND granularity = ? AND bucket_start = ? AND region = ?",
+            (metric, granularity, bucket_start, region),
+        ).fetchone()
+
+        sketch = partial["sketch"]
+        values = [
+            partial["samples"],
+            partial["events"],
+            partial["successes"],
+            partial["value_sum"],
+        ]
+        value_max = partial["value_max"]
+        if row:
+            sketch = LatencySketch.from_json(row[5]).merge(sketch)
+            values = [current + stored for current, stored in zip(values, row[:4])]
+            if row[4] is not None and (value_max is None or row[4] > value_max):
+                value_max = row[4]
+
+        conn.execute(
+            "INSERT OR REPLACE INTO metric_rollups "
+            "(metric, region, granularity, bucket_start, samples, events, successes, "
+            "value_sum, value_max, sketch) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (metric, region, granularity, bucket_start, *values, value_max, sketch.to_json()),
+        )
+
+
+def expire_buckets(conn, metric, now=None):
+    now = _now() if now is None else now
+    for granularity, retention in RETENTION_SECONDS.items():
+        conn.execute(
+            "DELETE FROM metric_rollups "
+            "WHERE metric = ? AND granularity = ? AND bucket_start < ?",
+            (metric, granularity, now - retention),
+        )
+
+
+def record_samples(conn, metric, samples):
+    # Returns how many samples were recorded.
+    now = _now()
+    samples = [sample for sample in samples if plausible_timestamp(sample["ts"], now)]
+    ensure_rollup_tables(conn)
+    _merge_buckets(conn, metric, _compact(samples))
+    expire_buckets(conn, metric, now)
+    return len(samples)
+
+
+def love_note_samples(events):
+    samples = []
+    for event in events:
+        ts = parse_timestamp(event.get("timestamp"))
+        if ts is None or event.get("latency_ms") is None:
+            continue
+        samples.append(
+            {
+                "region": event["region_destination"],
+                "ts": ts,
+                "events": 1,
+                "successes": 1 if event.get("delivery_status") == "delivered" else 0,
+                "value": float(event["latency_ms"]),
+            }
+        )
+    return samples
+
+
+def routing_samples(rows, default_ts=None):
+    samples = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        ts = parse_timestamp(row.get("timestamp")) or default_ts
+        try:
+            requests = float(row["request_count_per_min"])
+            failure_rate = float(row["failure_rate"])
+            latency = float(row["p95_latency_ms"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        # Rows that would put infinities, negative counts or a failure rate
+        # outside [0, 1] into a bucket are skipped and count as rejected.
+        if not all(math.isfinite(value) for value in (requests, failure_rate, latency)):
+            continue
+        if requests < 0 or latency < 0 or not 0 <= failure_rate <= 1:
+            continue
+        region = row.get("region")
+        if ts is None or not isinstance(region, str) or not region:
+            continue
+        requests = int(requests)
+        samples.append(
+            {
+                "region": region,
+                "ts": ts,
+                "events": requests,
+                "successes": int(round(requests * (1.0 - failure_rate))),
+                "value": latency,
+            }
+        )
+    return samples
+
+
+def rebuild_rollups(conn, loaded_at=None):
+    ensure_rollup_tables(conn)
+    conn.execute("DELETE FROM metric_rollups")
+
+    notes = conn.execute(
+        "SELECT region_destination, latency_ms, delivery_status, timestamp "
+        "FROM love_notes_telemetry WHERE region_destination IS NOT NULL"
+    ).fetchall()
+    record_samples(
+        conn,
+        "love_notes",
+        love_note_samples(
+            {
+                "region_destination": row[0],
+                "latency_ms": row[1],
+                "delivery_status": row[2],
+                "timestamp": row[3],
+            }
+            for row in notes
+        ),
+    )
+
+    # The routing CSV carries no timestamps, so its rows are stamped with the
+    # load time and land in the current bucket.
+    loaded_at = loaded_at or _now()
+    routing = conn.execute(
+        "SELECT region, request_count_per_min, p95_latency_ms, failure_rate "
+        "FROM global_routing"
+    ).fetchall()
+    record_samples(
+        conn,
+        "routing",
+        routing_samples(
+            (
+                {
+                    "region": row[0],
+                    "request_count_per_min": row[1],
+                    "p95_latency_ms": row[2],
+                    "failure_rate": row[3],
+                }
+                for row in routing
+            ),
+            default_ts=loaded_at,
+        ),
+    )
+
+
+def ingest_routing_samples(rows):
+    samples = routing_samples(rows, default_ts=_now())
+    conn = get_write_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        accepted = record_samples(conn, "routing", samples)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    if accepted:
+        bump_version()
+    return {"accepted": accepted, "rejected": len(rows) - accepted}
+
+
+def _pick_granularity(seconds):
+    if seconds <= RETENTION_SECONDS["minute"]:
+        return "minute"
+    return "hour"
+
+
+def _summarize(rows):
+    merged = {}
+    for row in rows:
+        entry = merged.get(row["region"])
+        if entry is None:
+            entry = {
+                "region": row["region"],
+                "samples": 0,
+                "events": 0,
+                "successes": 0,
+                "value_sum": 0.0,
+                "value_max": None,
+                "sketch": LatencySketch(),
+            }
+            merged[row["region"]] = entry
+        entry["samples"] += row["samples"]
+        entry["events"] += row["events"]
+        entry["successes"] += row["successes"]
+        entry["value_sum"] += row["value_sum"]
+        if row["value_max"] is not None and (
+            entry["value_max"] is None or row["value_max"] > entry["value_max"]
+        ):
+            entry["value_max"] = row["value_max"]
+        entry["sketch"].merge(LatencySketch.from_json(row["sketch"]))
+
+    summaries = {}
+    for region, entry in merged.items():
+        summaries[region] = {
+            "region": region,
+            "samples": entry["samples"],
+            "events": entry["events"],
+            "success_rate": entry["successes"] / entry["events"] if entry["events"] else None,
+            "avg_value": entry["value_sum"] / entry["samples"] if entry["samples"] else None,
+            "max_value": entry["value_max"],
+            "p95_value": entry["sketch"].quantile(0.95),
+        }
+    return summaries
+
+
+def window_summary(metric, seconds):
+    granularity = _pick_granularity(seconds)
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            "SELECT region, samples, events, successes, value_sum, value_max, sketch "
+            "FROM metric_rollups "
+            "WHERE metric = ? AND granularity = ? AND bucket_start >= ?",
+            (metric, granularity, _window_start(granularity, seconds, _now())),
+        ).fetchall()
+    finally:
+        conn.close()
+    return _summarize(rows)
+
+
+def window_comparison(metric, short_seconds=15 * 60, long_seconds=24 * 3600):
+    short = window_summary(metric, short_seconds)
+    long = window_summary(metric, long_seconds)
+    rows = []
+    for region in sorted(long):
+        rows.append({"region": region, "short": short.get(region), "long": long[region]})
+    return rows
+
+
+def time_series(metric, granularity="minute", seconds=3600, region=None):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    sql = (
+        "SELECT region, bucket_start, samples, events, successes, value_sum, value_max, sketch "
+        "FROM metric_rollups "
+        "WHERE metric = ? AND granularity = ? AND bucket_start >= ? "
+    )
+    params = [metric, granularity, _window_start(granularity, seconds, _now())]
+    if region:
+        sql += "AND region = ? "
+        params.append(region)
+    sql += "ORDER BY region, bucket_start"
+
+    conn = get_db()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    points = []
+    for row in rows:
+        sketch = LatencySketch.from_json(row["sketch"])
+        points.append(
+            {
+                "region": row["region"],
+                "bucket_start": _format_epoch(row["bucket_start"]),
+                "samples": row["samples"],
+                "events": row["events"],
+                "success_rate": row["successes"] / row["events"] if row["events"] else None,
+                "avg_value": row["value_sum"] / row["samples"] if row["samples"] else None,
+                "max_value": row["value_max"],
+                "p95_value": sketch.quantile(0.95),
+            }
+        )
+    return points
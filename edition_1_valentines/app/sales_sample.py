@@ -0,0 +1,149 @@
+import os
+from math import sqrt
+
+# A stratified sample of sales_wide for approximate dashboard numbers. Every
+# (country, category) stratum keeps SAMPLE_RATE of its rows, and at least
+# SAMPLE_MIN_ROWS so small strata are still estimated. Rows are picked by a
+# hash of the rowid, so the same data always gives the same sample. Each row
+# carries its stratum size and sample size; weight is their ratio.
+SAMPLE_RATE = float(os.getenv("VALENTINES_SAMPLE_RATE", "0.01"))
+SAMPLE_MIN_ROWS = int(os.getenv("VALENTINES_SAMPLE_MIN_ROWS", "30"))
+Z_95 = 1.96
+
+BUILD_SQL = (
+    "CREATE TABLE sales_sample AS "
+    "WITH ranked AS ("
+    "SELECT date_id, year, month, product_name, category, channel, country_code, "
+    "loyalty_tier, promotion_id, promo_name, promo_channel, discount_percent, "
+    "quantity_sold, total_amount, cost_amount, "
+    "ROW_NUMBER() OVER (PARTITION BY country_code, category "
+    "ORDER BY (rowid * 2654435761) % 4294967296, rowid) AS pick, "
+    "COUNT(*) OVER (PARTITION BY country_code, category) AS stratum_rows "
+    "FROM sales_wide), "
+    "sized AS ("
+    "SELECT *, MIN(stratum_rows, MAX(?, -CAST(-stratum_rows * ? AS INTEGER))) AS sample_rows "
+    "FROM ranked) "
+    "SELECT date_id, year, month, product_name, category, channel, country_code, "
+    "loyalty_tier, promotion_id, promo_name, promo_channel, discount_percent, "
+    "quantity_sold, total_amount, cost_amount, stratum_rows, sample_rows, "
+    "CAST(stratum_rows AS REAL) / sample_rows AS weight "
+    "FROM sized WHERE pick <= sample_rows "
+    "ORDER BY country_code, category, date_id"
+)
+
+# Per-stratum sums over the sampled rows that match the filters ({where_sql}).
+# Every stratum the country and category filters allow ({strata_where}) is
+# returned, including ones with no matching sampled row, together with sums
+# over all of its sampled rows for the variance of those strata.
+STRATA_SQL = (
+    "SELECT s.population, s.sampled, "
+    "COALESCE(m.orders, 0) AS orders, "
+    "COALESCE(m.revenue, 0.0) AS revenue, "
+    "COALESCE(m.revenue_sq, 0.0) AS revenue_sq, "
+    "COALESCE(m.profit, 0.0) AS profit, "
+    "COALESCE(m.profit_sq, 0.0) AS profit_sq, "
+    "s.all_revenue, s.all_revenue_sq, s.all_profit, s.all_profit_sq "
+    "FROM ("
+    "SELECT country_code, category, "
+    "MAX(stratum_rows) AS population, MAX(sample_rows) AS sampled, "
+    "TOTAL(total_amount) AS all_revenue, "
+    "TOTAL(total_amount * total_amount) AS all_revenue_sq, "
+    "TOTAL(total_amount - cost_amount) AS all_profit, "
+    "TOTAL((total_amount - cost_amount) * (total_amount - cost_amount)) AS all_profit_sq "
+    "FROM sales_sample {strata_where} "
+    "GROUP BY country_code, category) AS s "
+    "LEFT JOIN ("
+    "SELECT country_code, category, COUNT(*) AS orders, "
+    "TOTAL(total_amount) AS revenue, "
+    "TOTAL(total_amount * total_amount) AS revenue_sq, "
+    "TOTAL(total_amount - cost_amount) AS profit, "
+    "TOTAL((total_amount - cost_amount) * (total_amount - cost_amount)) AS profit_sq "
+    "FROM sales_sample {where_sql} "
+    "GROUP BY country_code, category) AS m "
+    "USING (country_code, category)"
+)
+
+
+def build_sales_sample(conn):
+    conn.execute("DROP TABLE IF EXISTS sales_sample")
+    conn.execute(BUILD_SQL, [SAMPLE_MIN_ROWS, SAMPLE_RATE])
+    conn.execute("ANALYZE sales_sample")
+
+
+def _variance(population, sampled, total, squares):
+    # Variance of the stratum's estimated total under sampling without
+    # replacement; a fully sampled stratum is exact.
+    if sampled < 2 or sampled >= population:
+        return 0.0
+    spread = max(squares - total * total / sampled, 0.0) / (sampled - 1)
+    return population * population * (1 - sampled / population) * spread / sampled
+
+
+def _variance_inputs(row):
+    # No matching sampled row does not mean no matching rows in the stratum.
+    # Its variance is taken as if one sampled row had matched, with the
+    # stratum's mean amounts, instead of zero, so narrow filters do not get
+    # falsely tight margins.
+    if row["orders"]:
+        return row
+    sampled = row["sampled"]
+    return {
+        "population": row["population"],
+        "sampled": sampled,
+        "orders": 1,
+        "revenue": row["all_revenue"] / sampled,
+        "revenue_sq": row["all_revenue_sq"] / sampled,
+        "profit": row["all_profit"] / sampled,
+        "profit_sq": row["all_profit_sq"] / sampled,
+    }
+
+
+def estimate_summary(strata):
+    # Stratified estimates of the dashboard summary with 95% margins. Orders
+    # are the total of a 0/1 match flag; the average order is a ratio of two
+    # totals, with its margin from the linearised variance.
+    estimates = {"orders": 0.0, "revenue": 0.0, "profit": 0.0}
+    variances = {"orders": 0.0, "revenue": 0.0, "profit": 0.0}
+    sample_rows = 0
+    for row in strata:
+        scale = row["population"] / row["sampled"]
+        sample_rows += row["orders"]
+        spread = _variance_inputs(row)
+        for measure, squares in (
+            ("orders", spread["orders"]),
+            ("revenue", spread["revenue_sq"]),
+            ("profit", spread["profit_sq"]),
+        ):
+            estimates[measure] += scale * row[measure]
+            variances[measure] += _variance(row["population"], row["sampled"], spread[measure], squares)
+
+    orders = estimates["orders"]
+    avg_order = estimates["revenue"] / orders if orders else None
+    avg_variance = 0.0
+    if avg_order is not None:
+        for row in strata:
+            row = _variance_inputs(row)
+            total = row["revenue"] - avg_order * row["orders"]
+            squares = (
+                row["revenue_sq"]
+                - 2 * avg_order * row["revenue"]
+                + avg_order * avg_order * row["orders"]
+            )
+            avg_variance += _variance(row["population"], row["sampled"], total, squares)
+        avg_variance /= orders * orders
+
+    return {
+        "orders": round(orders),
+        "revenue": estimates["revenue"] if sample_rows else None,
+        "profit": estimates["profit"] if sample_rows else None,
+        "avg_order": avg_order,
+        "approximate": True,
+        "confidence": 0.95,
+        "sample_rows": sample_rows,
+        "margin": {
+            "orders": Z_95 * sqrt(variances["orders"]),
+            "revenue": Z_95 * sqrt(variances["revenue"]),
+            "profit": Z_95 * sqrt(variances["profit"]),
+            "avg_order": Z_95 * sqrt(avg_variance) if avg_order is not None else None,
+        },
+    }
@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .rollups import parse_timestamp, plausible_timestamp
+
+WINDOW_SECONDS = 300
+WINDOW_SLOTS = 10
+GEO_HOP_SECONDS = 3600
+IDLE_SECONDS = 2 * GEO_HOP_SECONDS
+MAX_TRACKED_KEYS = 100000
+
+USER_FAILURE_THRESHOLD = 10
+IP_ATTEMPT_THRESHOLD = 30
+MFA_FAILURE_THRESHOLD = 3
+
+
+class SlidingCounter:
+    # Ring of fixed-width time slots. Adding an event clears only the slots
+    # that fell out of the window since the last update, so both updates and
+    # reads are O(1) amortized and memory is fixed per key.
+    __slots__ = ("counts", "head", "total")
+
+    def __init__(self, slots=WINDOW_SLOTS):
+        self.counts = [0] * slots
+        self.head = None
+        self.total = 0
+
+    def _advance(self, slot):
+        if self.head is None:
+            self.head = slot
+            return
+        if slot <= self.head:
+            return
+        size = len(self.counts)
+        for step in range(1, min(slot - self.head, size) + 1):
+            idx = (self.head + step) % size
+            self.total -= self.counts[idx]
+            self.counts[idx] = 0
+        self.head = slot
+
+    def add(self, slot, amount=1):
+        self._advance(slot)
+        if self.head - slot >= len(self.counts):
+            return self.total
+        self.counts[slot % len(self.counts)] += amount
+        self.total += amount
+        return self.total
+
+
+class _UserState:
+    __slots__ = ("failures", "mfa_failures", "last_geo", "last_seen")
+
+    def __init__(self):
+        self.failures = SlidingCounter()
+        self.mfa_failures = SlidingCounter()
+        self.last_geo = None
+        self.last_seen = None
+
+
+class _IpState:
+    __slots__ = ("attempts", "last_seen")
+
+    def __init__(self):
+        self.attempts = SlidingCounter()
+        self.last_seen = None
+
+
+def _wall_clock():
+    return int(time.time())
+
+
+def normalize_login(event, now=None):
+    if not isinstance(event, dict):
+        return None
+    ts = parse_timestamp(event.get("timestamp"))
+    user_id = event.get("user_id")
+    ip_address = event.get("ip_address")
+    if ts is None or not user_id or not ip_address:
+        return None
+    # Same bounds as the rollups: one far-future timestamp would move the
+    # detector's clock ahead, evict every window and make later events stale.
+    if not plausible_timestamp(ts, now):
+        return None
+    try:
+        failed_attempts = float(event.get("failed_attempts") or 0)
+        risk_score = float(event.get("risk_score") or 0.0)
+    except (TypeError, ValueError):
+        return None
+    # float() accepts "nan" and "inf"; int() of those raises.
+    if not math.isfinite(failed_attempts) or not math.isfinite(risk_score):
+        return None
+    return {
+        "ts": ts,
+        "user_id": str(user_id),
+        "ip_address": str(ip_address),
+        "geo": event.get("geo") or None,
+        "failed_attempts": max(int(failed_attempts), 0),
+        "risk_score": risk_score,
+        "mfa_result": (event.get("MFA_result") or event.get("mfa_result") or "").lower(),
+        "login_attempt_id": event.get("login_attempt_id"),
+    }
+
+
+class LoginAnomalyDetector:
+    def __init__(
+        self,
+        window_seconds=WINDOW_SECONDS,
+        slots=WINDOW_SLOTS,
+        max_keys=MAX_TRACKED_KEYS,
+        idle_seconds=IDLE_SECONDS,
+        alert_history=500,
+        clock=_wall_clock,
+    ):
+        self.slot_width = max(window_seconds // slots, 1)
+        self.slots = slots
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        # Timestamps are checked against this clock; replays pass their own.
+        self.clock = clock
+        self.users = OrderedDict()
+        self.ips = OrderedDict()
+        self.recent_alerts = deque(maxlen=alert_history)
+        self.processed = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def _touch(self, table, key, factory, ts):
+        state = table.get(key)
+        if state is None:
+            state = factory()
+            table[key] = state
+        else:
+            table.move_to_end(key)
+        state.last_seen = ts if state.last_seen is None else max(state.last_seen, ts)
+        self._evict(table, ts)
+        return state
+
+    def _evict(self, table, now):
+        # Entries are kept in last-touched order, so only the head needs
+        # checking: it is the least recently seen key.
+        while table:
+            key, state = next(iter(table.items()))
+            if len(table) > self.max_keys or now - state.last_seen > self.idle_seconds:
+                del table[key]
+                self.evicted += 1
+            else:
+                break
+
+    def _alert(self, alerts, rule, event, detail):
+        alert = {
+            "rule": rule,
+            "user_id": event["user_id"],
+            "ip_address": event["ip_address"],
+            "geo": event["geo"],
+            "login_attempt_id": event["login_attempt_id"],
+            "ts": event["ts"],
+            "detail": detail,
+        }
+        alerts.append(alert)
+        self.recent_alerts.append(alert)
+
+    def _process(self, event, alerts):
+        ts = event["ts"]
+        slot = ts // self.slot_width
+
+        user = self._touch(self.users, event["user_id"], _UserState, ts)
+        ip = self._touch(self.ips, event["ip_address"], _IpState, ts)
+
+        if event["failed_attempts"]:
+            before = user.failures.total
+            after = user.failures.add(slot, event["failed_attempts"])
+            if before < USER_FAILURE_THRESHOLD <= after:
+                self._alert(alerts, "user_failure_burst", event, {"failed_attempts": after})
+
+        before = ip.attempts.total
+        after = ip.attempts.add(slot)
+        if before < IP_ATTEMPT_THRESHOLD <= after:
+            self._alert(alerts, "ip_attempt_burst", event, {"attempts": after})
+
+        if event["mfa_result"] == "fail":
+            before = user.mfa_failures.total
+            after = user.mfa_failures.add(slot)
+            if before < MFA_FAILURE_THRESHOLD <= after:
+                self._alert(alerts, "repeated_mfa_failure", event, {"mfa_failures": after})
+
+        geo = event["geo"]
+        if geo:
+            previous_geo = user.last_geo
+            if (
+                previous_geo
+                and previous_geo[0] != geo
+                and 0 <= ts - previous_geo[1] <= GEO_HOP_SECONDS
+            ):
+                self._alert(
+                    alerts,
+                    "geo_hop",
+                    event,
+                    {"from": previous_geo[0], "to": geo, "seconds": ts - previous_geo[1]},
+                )
+            if previous_geo is None or ts >= previous_geo[1]:
+                user.last_geo = (geo, ts)
+
+    def process_batch(self, events):
+        alerts = []
+        rejected = 0
+        now = self.clock()
+        with self._lock:
+            for raw in events:
+                event = normalize_login(raw, now)
+                if event is None:
+                    rejected += 1
+                    continue
+                self._process(event, alerts)
+                self.processed += 1
+        return {
+            "processed": len(events) - rejected,
+            "rejected": rejected,
+            "alerts": alerts,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "tracked_users": len(self.users),
+                "tracked_ips": len(self.ips),
+                "evicted": self.evicted,
+                "window_seconds": self.slot_width * self.slots,
+                "max_tracked_keys": self.max_keys,
+            }
+
+    def alerts(self, limit=100):
+        with self._lock:
+            if limit <= 0:
+                return []
+            return list(self.recent_alerts)[-limit:][::-1]
+
+
+DETECTOR = LoginAnomalyDetector()
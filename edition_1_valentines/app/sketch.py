@@ -0,0 +1,58 @@
+import json
+
+SIGNIFICANT_BITS = 7
+
+
+def _bucket(value):
+    # HDR-style bucketing: keep SIGNIFICANT_BITS of precision, so every
+    # bucket is within ~1% of the values it holds regardless of magnitude.
+    value = max(int(value), 0)
+    shift = value.bit_length() - SIGNIFICANT_BITS
+    if shift <= 0:
+        return value
+    return (value >> shift) << shift
+
+
+def _bucket_width(key):
+    shift = key.bit_length() - SIGNIFICANT_BITS
+    return 1 if shift <= 0 else 1 << shift
+
+
+class LatencySketch:
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    @classmethod
+    def from_json(cls, text):
+        if not text:
+            return cls()
+        return cls({int(key): count for key, count in json.loads(text).items()})
+
+    def to_json(self):
+        return json.dumps(self.counts, separators=(",", ":"))
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add(self, value, count=1):
+        key = _bucket(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        return self
+
+    def quantile(self, q):
+        total = self.total
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen > rank:
+                return key + (_bucket_width(key) - 1) / 2.0
+        key = max(self.counts)
+        return key + (_bucket_width(key) - 1) / 2.0
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# Statements slower than VALENTINES_SLOW_QUERY_MS on connections from
+# get_db/get_write_db are kept here with their query plan. The cursor in
+# metrics.py times each statement from execute until its rows have been
+# read and calls record(). The latest entries stay in a ring buffer for
+# /debug/slow-queries and every entry is appended to a rotating JSON-lines
+# file. Set the threshold to "off" to disable.
+BASE_DIR = Path(__file__).resolve().parent
+_threshold = os.getenv("VALENTINES_SLOW_QUERY_MS", "100")
+THRESHOLD_SECONDS = None if _threshold.lower() in ("", "off") else float(_threshold) / 1000
+BUFFER_SIZE = int(os.getenv("VALENTINES_SLOW_QUERY_BUFFER", "500"))
+LOG_PATH = os.getenv("VALENTINES_SLOW_QUERY_LOG", str(BASE_DIR / "slow-queries.log"))
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+# Parameters are customer ids, payment tokens and free text, so by default
+# only their types are kept; VALENTINES_SLOW_QUERY_REDACT=0 keeps values.
+REDACT = os.getenv("VALENTINES_SLOW_QUERY_REDACT", "1") != "0"
+MAX_PARAM_CHARS = 80
+MAX_FINGERPRINTS = 1000
+EXPLAIN_PREFIX = "EXPLAIN QUERY PLAN "
+EXPLAINABLE = ("select", "with", "insert", "update", "delete", "replace")
+
+_lock = threading.Lock()
+_entries = deque(maxlen=BUFFER_SIZE)
+_totals = {}
+_logger = None
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def enabled():
+    return THRESHOLD_SECONDS is not None
+
+
+def normalize(sql):
+    # Literals and IN lists collapse, so the same query shape with other
+    # values or list lengths gets one fingerprint.
+    text = _STRING.sub("?", sql)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(...)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def _param(value):
+    if REDACT and value is not None:
+        return f"<{type(value).__name__}>"
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAM_CHARS:
+        return value[:MAX_PARAM_CHARS] + "..."
+    return value
+
+
+def _params(parameters):
+    if isinstance(parameters, dict):
+        return {key: _param(value) for key, value in parameters.items()}
+    return [_param(value) for value in parameters or ()]
+
+
+def explain(conn, sql, parameters):
+    # A plain cursor, so the EXPLAIN is not itself timed or recorded.
+    if not sql.lstrip().lower().startswith(EXPLAINABLE):
+        return []
+    try:
+        rows = sqlite3.Cursor(conn).execute(EXPLAIN_PREFIX + sql, parameters).fetchall()
+    except sqlite3.Error as exc:
+        return [f"(no plan: {exc})"]
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node_id] + detail)
+    return plan
+
+
+def _caller():
+    # The first frame outside the database plumbing, so entries point at
+    # the function in queries.py (or wherever) that issued the SQL.
+    frame = sys._getframe(2)
+    skip = (__file__, str(BASE_DIR / "metrics.py"), str(BASE_DIR / "db.py"))
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(str(BASE_DIR)) and path not in skip:
+            return f"{Path(path).name}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _file_logger():
+    global _logger
+    if _logger is None:
+        _logger = logging.getLogger(__name__)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        try:
+            handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        except OSError:
+            handler = logging.NullHandler()
+        _logger.addHandler(handler)
+    return _logger
+
+
+def record(conn, sql, parameters, seconds, rows):
+    normalized = normalize(sql)
+    entry = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fingerprint": fingerprint(normalized),
+        "sql": normalized,
+        "params": _params(parameters),
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "caller": _caller(),
+        "plan": explain(conn, sql, parameters),
+    }
+    with _lock:
+        _entries.append(entry)
+        totals = _totals.get(entry["fingerprint"])
+        if totals is None and len(_totals) < MAX_FINGERPRINTS:
+            totals = _totals[entry["fingerprint"]] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+        if totals is not None:
+            totals["count"] += 1
+            totals["total_ms"] += entry["ms"]
+            totals["max_ms"] = max(totals["max_ms"], entry["ms"])
+            totals["rows"] += rows
+            totals["latest"] = entry
+    if LOG_PATH:
+        _file_logger().info(json.dumps(entry, default=str))
+
+
+def slow_query_summary():
+    # One row per fingerprint since the process started, worst total first.
+    # The latest entry supplies the example parameters, caller and plan.
+    with _lock:
+        totals = [dict(values) for values in _totals.values()]
+    summary = []
+    for values in totals:
+        latest = values.pop("latest")
+        summary.append(
+            {
+                "fingerprint": latest["fingerprint"],
+                "sql": latest["sql"],
+                "count": values["count"],
+                "total_ms": round(values["total_ms"], 1),
+                "mean_ms": round(values["total_ms"] / values["count"], 1),
+                "max_ms": round(values["max_ms"], 1),
+                "mean_rows": round(values["rows"] / values["count"], 1),
+                "last_at": latest["at"],
+                "caller": latest["caller"],
+                "params": latest["params"],
+                "plan": latest["plan"],
+            }
+        )
+    summary.sort(key=lambda row: row["total_ms"], reverse=True)
+    return summary
+
+
+def recent_slow_queries(limit=50):
+    with _lock:
+        return list(_entries)[-limit:][::-1]
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .data_loader import DATASETS, ensure_db
+from .db import DB_PATH, read_mode, set_read_mode
+from .locks import file_lock
+
+# Bump when the schema of loaded or materialized tables changes so that
+# snapshots built by older code are rejected instead of served.
+SNAPSHOT_FORMAT = 1
+# The build runs a full integrity_check. Boot only repeats it (as the
+# cheaper quick_check, which still reads every page) when asked to, so a
+# large snapshot opens without scanning the file.
+BOOT_QUICK_CHECK = os.getenv("VALENTINES_SNAPSHOT_QUICK_CHECK", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+
+def data_fingerprint():
+    # A hash of the CSV contents: an edit that keeps the file size is caught,
+    # and copying or unzipping the data (new mtimes) is not mistaken for one.
+    digest = hashlib.sha1(f"format={SNAPSHOT_FORMAT}".encode("utf-8"))
+    for table_name, csv_path in DATASETS.items():
+        digest.update(f"{table_name}\x1f{csv_path.name}\x1f".encode("utf-8"))
+        if csv_path.exists():
+            with open(csv_path, "rb") as handle:
+                digest.update(hashlib.file_digest(handle, "sha1").digest())
+        else:
+            digest.update(b"missing")
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def data_stats():
+    # Name, size and mtime of every CSV: a stat call per file, so boot cost
+    # does not grow with the data. Recorded at build time next to the hash.
+    stats = {}
+    for table_name, csv_path in DATASETS.items():
+        try:
+            stat = csv_path.stat()
+        except OSError:
+            stats[table_name] = None
+            continue
+        stats[table_name] = [csv_path.name, stat.st_size, stat.st_mtime_ns]
+    return json.dumps(stats, sort_keys=True)
+
+
+def _same_data(meta, full_hash):
+    # Boot trusts matching stats and only hashes the CSVs when they differ
+    # (new files, or mtimes reset by an unzip); --check always hashes.
+    if not full_hash and meta.get("data_stats") == data_stats():
+        return True
+    return meta.get("data_fingerprint") == data_fingerprint()
+
+
+def boot_lock(path=DB_PATH):
+    # Workers start together. Only the one holding the lock may discard a
+    # stale snapshot and load the CSVs; the others then find its result.
+    return file_lock(path)
+
+
+def build_snapshot(output=DB_PATH):
+    output = Path(output)
+    build_path = output.with_name(f"{output.name}.build")
+    build_path.unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    ensure_db(build_path)
+    conn = sqlite3.connect(build_path)
+    try:
+        tables = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'"
+        ).fetchone()[0]
+        meta = {
+            "format": str(SNAPSHOT_FORMAT),
+            "data_fingerprint": data_fingerprint(),
+            "data_stats": data_stats(),
+            "built_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "tables": str(tables),
+        }
+        conn.execute("CREATE TABLE app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.executemany("INSERT INTO app_meta (key, value) VALUES (?, ?)", meta.items())
+        conn.commit()
+
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            raise RuntimeError(f"integrity check failed: {result}")
+    finally:
+        conn.close()
+
+    build_path.replace(output)
+    meta["build_seconds"] = f"{time.perf_counter() - start:.2f}"
+    meta["bytes"] = str(output.stat().st_size)
+    return meta
+
+
+def check_snapshot(path=DB_PATH, quick_check=True, full_hash=True):
+    # Returns the snapshot metadata, None for a database that was not built as
+    # a snapshot, and raises ValueError for a stale or damaged snapshot.
+    path = Path(path)
+    try:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            has_meta = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'app_meta'"
+            ).fetchone()
+            if has_meta is None:
+                return None
+            meta = dict(conn.execute("SELECT key, value FROM app_meta").fetchall())
+            result = conn.execute("PRAGMA quick_check").fetchone()[0] if quick_check else "ok"
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as exc:
+        raise ValueError(f"unreadable database: {exc}") from exc
+
+    if result != "ok":
+        raise ValueError(f"integrity check failed: {result}")
+    if meta.get("format") != str(SNAPSHOT_FORMAT):
+        raise ValueError(f"format {meta.get('format')} does not match {SNAPSHOT_FORMAT}")
+    if not _same_data(meta, full_hash):
+        raise ValueError("built from different CSV files")
+    return meta
+
+
+def open_snapshot(path=DB_PATH):
+    # Serves a prebuilt snapshot read-only. A stale or damaged snapshot is
+    # removed so the caller falls back to loading the CSVs; call it under
+    # boot_lock() so no other worker is loading into the same path.
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        meta = check_snapshot(path, quick_check=BOOT_QUICK_CHECK, full_hash=False)
+    except ValueError as exc:
+        logger.warning("discarding snapshot %s: %s", path, exc)
+        path.unlink()
+        return None
+    if meta is None:
+        return None
+    if read_mode() == "rw":
+        set_read_mode("ro")
+    logger.info("serving snapshot %s built %s", path.name, meta.get("built_at"))
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the valentines.db snapshot")
+    parser.add_argument("--output", default=str(DB_PATH))
+    parser.add_argument("--check", action="store_true", help="verify an existing snapshot")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            meta = check_snapshot(args.output)
+        except ValueError as exc:
+            print(f"invalid snapshot: {exc}")
+            return 1
+        if meta is None:
+            print("not a snapshot: app_meta table missing")
+            return 1
+    else:
+        meta = build_snapshot(args.output)
+    for key, value in meta.items():
+        print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
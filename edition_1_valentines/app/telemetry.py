@@ -0,0 +1,267 @@
+import math
+from datetime import datetime, timezone
+
+from .cache import bump_version
+from .db import get_db, get_write_db
+from .rollups import love_note_samples, parse_timestamp, plausible_timestamp, record_samples
+from .sketch import LatencySketch
+
+RAW_COLUMNS = [
+    "message_id",
+    "region_origin",
+    "region_destination",
+    "latency_ms",
+    "retry_count",
+    "delivery_status",
+    "device_type",
+    "network_speed_mbps",
+    "timestamp",
+    "batch_id",
+]
+
+STATS_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS love_notes_destination_stats ("
+    "region_destination TEXT PRIMARY KEY, "
+    "events INTEGER NOT NULL, "
+    "delivered INTEGER NOT NULL, "
+    "latency_sum REAL NOT NULL, "
+    "latency_max REAL, "
+    "sketch TEXT NOT NULL, "
+    "updated_at TEXT)"
+)
+
+BATCH_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS love_notes_batches ("
+    "batch_id TEXT PRIMARY KEY, "
+    "events INTEGER NOT NULL, "
+    "ingested_at TEXT)"
+)
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def ensure_telemetry_tables(conn):
+    conn.execute(STATS_TABLE_SQL)
+    conn.execute(BATCH_TABLE_SQL)
+
+
+TEXT_FIELDS = ("message_id", "region_origin", "region_destination", "delivery_status", "device_type")
+
+
+def _clean_event(event, batch_id):
+    # Text fields must be scalars; a list or dict cannot be bound to SQLite.
+    text = {}
+    for field in TEXT_FIELDS:
+        value = event.get(field)
+        if value is not None and not isinstance(value, (str, int, float)):
+            return None
+        text[field] = None if value is None else str(value)
+    latency = event.get("latency_ms")
+    if not text["region_destination"] or latency is None or not text["delivery_status"]:
+        return None
+    try:
+        latency = float(latency)
+        retry_count = int(event.get("retry_count") or 0)
+        speed = event.get("network_speed_mbps")
+        speed = None if speed is None else float(speed)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    # float() accepts "nan" and "inf", which would poison the sums and the
+    # latency sketch.
+    if not math.isfinite(latency) or latency < 0 or retry_count < 0:
+        return None
+    if speed is not None and not math.isfinite(speed):
+        return None
+    # Same bounds as the routing samples: an unparseable, stale or
+    # far-future timestamp is rejected rather than stored as sent.
+    timestamp = _now()
+    if event.get("timestamp"):
+        ts = parse_timestamp(event["timestamp"])
+        if ts is None or not plausible_timestamp(ts):
+            return None
+        timestamp = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        **text,
+        "latency_ms": latency,
+        "retry_count": retry_count,
+        "network_speed_mbps": speed,
+        "timestamp": timestamp,
+        "batch_id": batch_id,
+    }
+
+
+def _aggregate(events):
+    partials = {}
+    for event in events:
+        destination = event["region_destination"]
+        partial = partials.get(destination)
+        if partial is None:
+            partial = {
+                "events": 0,
+                "delivered": 0,
+                "latency_sum": 0.0,
+                "latency_max": None,
+                "sketch": LatencySketch(),
+            }
+            partials[destination] = partial
+
+        latency = event["latency_ms"]
+        partial["events"] += 1
+        if event["delivery_status"] == "delivered":
+            partial["delivered"] += 1
+        partial["latency_sum"] += latency
+        if partial["latency_max"] is None or latency > partial["latency_max"]:
+            partial["latency_max"] = latency
+        partial["sketch"].add(latency)
+    return partials
+
+
+def _merge_partials(conn, partials):
+    updated_at = _now()
+    for destination, partial in partials.items():
+        row = conn.execute(
+            "SELECT events, delivered, latency_sum, latency_max, sketch "
+            "FROM love_notes_destination_stats WHERE region_destination = ?",
+            (destination,),
+        ).fetchone()
+
+        sketch = partial["sketch"]
+        events = partial["events"]
+        delivered = partial["delivered"]
+        latency_sum = partial["latency_sum"]
+        latency_max = partial["latency_max"]
+        if row:
+            sketch = LatencySketch.from_json(row[4]).merge(sketch)
+            events += row[0]
+            delivered += row[1]
+            latency_sum += row[2]
+            if row[3] is not None and (latency_max is None or row[3] > latency_max):
+                latency_max = row[3]
+
+        conn.execute(
+            "INSERT OR REPLACE INTO love_notes_destination_stats "
+            "(region_destination, events, delivered, latency_sum, latency_max, sketch, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                destination,
+                events,
+                delivered,
+                latency_sum,
+                latency_max,
+                sketch.to_json(),
+                updated_at,
+            ),
+        )
+
+
+def rebuild_destination_stats(conn):
+    ensure_telemetry_tables(conn)
+    conn.execute("DELETE FROM love_notes_destination_stats")
+    rows = conn.execute(
+        "SELECT region_destination, latency_ms, delivery_status "
+        "FROM love_notes_telemetry "
+        "WHERE region_destination IS NOT NULL AND latency_ms IS NOT NULL"
+    )
+    events = (
+        {
+            "region_destination": row[0],
+            "latency_ms": float(row[1]),
+            "delivery_status": row[2],
+        }
+        for row in rows
+    )
+    _merge_partials(conn, _aggregate(events))
+    conn.execute(
+        "INSERT OR IGNORE INTO love_notes_batches (batch_id, events, ingested_at) "
+        "SELECT batch_id, COUNT(*), ? FROM love_notes_telemetry "
+        "WHERE batch_id IS NOT NULL GROUP BY batch_id",
+        (_now(),),
+    )
+
+
+def ingest_love_note_batch(batch_id, events):
+    cleaned = []
+    rejected = 0
+    for event in events:
+        row = _clean_event(event, batch_id) if isinstance(event, dict) else None
+        if row is None:
+            rejected += 1
+        else:
+            cleaned.append(row)
+
+    conn = get_write_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ensure_telemetry_tables(conn)
+        duplicate = conn.execute(
+            "SELECT 1 FROM love_notes_batches WHERE batch_id = ?", (batch_id,)
+        ).fetchone()
+        if duplicate:
+            conn.rollback()
+            return {
+                "batch_id": batch_id,
+                "accepted": 0,
+                "rejected": rejected,
+                "duplicate": True,
+            }
+
+        placeholders = ", ".join("?" for _ in RAW_COLUMNS)
+        conn.executemany(
+            f"INSERT INTO love_notes_telemetry ({', '.join(RAW_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            [tuple(row[column] for column in RAW_COLUMNS) for row in cleaned],
+        )
+        _merge_partials(conn, _aggregate(cleaned))
+        record_samples(conn, "love_notes", love_note_samples(cleaned))
+        conn.execute(
+            "INSERT INTO love_notes_batches (batch_id, events, ingested_at) VALUES (?, ?, ?)",
+            (batch_id, len(cleaned), _now()),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if cleaned:
+        bump_version()
+    return {
+        "batch_id": batch_id,
+        "accepted": len(cleaned),
+        "rejected": rejected,
+        "duplicate": False,
+    }
+
+
+def destination_stats():
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            "SELECT region_destination, events, delivered, latency_sum, latency_max, sketch "
+            "FROM love_notes_destination_stats"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    stats = []
+    for row in rows:
+        sketch = LatencySketch.from_json(row["sketch"])
+        events = row["events"] or 0
+        stats.append(
+            {
+                "region_destination": row["region_destination"],
+                "events": events,
+                "avg_latency": row["latency_sum"] / events if events else None,
+                "max_latency": row["latency_max"],
+                "p50_latency": sketch.quantile(0.50),
+                "p95_latency": sketch.quantile(0.95),
+                "p99_latency": sketch.quantile(0.99),
+                "success_rate": row["delivered"] / events if events else None,
+            }
+        )
+    stats.sort(key=lambda item: item["avg_latency"] or 0, reverse=True)
+    return stats
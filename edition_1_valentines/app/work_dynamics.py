@@ -0,0 +1,165 @@
+import json
+import re
+
+MEETING_ID_PATTERN = re.compile(r"^MTG\d+$")
+USER_ID_PATTERN = re.compile(r"^U\d+$")
+RESPONSE_PATTERNS = {"accepted", "declined", "tentative", "ghosted"}
+BOOLEAN_VALUES = {"true": 1, "false": 0, "1": 1, "0": 0}
+
+SOURCE_COLUMNS = [
+    "event_id",
+    "meeting_id",
+    "participant_ids",
+    "response_pattern",
+    "cross_timezone_issues",
+    "sentiment_of_notes",
+    "action_items_completed",
+]
+
+BRIDGE_SQL = [
+    "DROP TABLE IF EXISTS meeting_participant",
+    "DROP TABLE IF EXISTS participant_load",
+    "CREATE TABLE meeting_participant ("
+    "meeting_id TEXT NOT NULL, "
+    "user_id TEXT NOT NULL, "
+    "PRIMARY KEY (meeting_id, user_id)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX idx_meeting_participant_user_id ON meeting_participant(user_id, meeting_id)",
+    "CREATE TABLE participant_load ("
+    "user_id TEXT PRIMARY KEY, "
+    "meetings INTEGER NOT NULL, "
+    "events INTEGER NOT NULL, "
+    "cross_timezone_events INTEGER NOT NULL, "
+    "cross_timezone_rate REAL, "
+    "avg_sentiment REAL, "
+    "action_items_completed INTEGER NOT NULL)",
+    "CREATE INDEX idx_participant_load_meetings ON participant_load(meetings DESC, user_id)",
+]
+
+
+def _parse_participants(value):
+    try:
+        participants = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(participants, list) or not participants:
+        return None
+    if not all(isinstance(item, str) and USER_ID_PATTERN.match(item) for item in participants):
+        return None
+    return sorted(set(participants))
+
+
+def parse_work_event(row):
+    if not MEETING_ID_PATTERN.match(str(row["meeting_id"] or "")):
+        return None, "bad_format:meeting_id"
+
+    participants = _parse_participants(row["participant_ids"])
+    if participants is None:
+        return None, "bad_format:participant_ids"
+
+    if str(row["response_pattern"] or "").lower() not in RESPONSE_PATTERNS:
+        return None, "not_allowed:response_pattern"
+
+    cross_timezone = BOOLEAN_VALUES.get(str(row["cross_timezone_issues"]).lower())
+    if cross_timezone is None:
+        return None, "not_allowed:cross_timezone_issues"
+
+    try:
+        sentiment = float(row["sentiment_of_notes"])
+    except (TypeError, ValueError):
+        return None, "invalid_type:sentiment_of_notes"
+    if not -1.0 <= sentiment <= 1.0:
+        return None, "out_of_range:sentiment_of_notes"
+
+    action_items = row["action_items_completed"]
+    try:
+        action_items = 0 if action_items in (None, "") else int(float(action_items))
+    except (TypeError, ValueError):
+        return None, "invalid_type:action_items_completed"
+
+    return {
+        "event_id": row["event_id"],
+        "meeting_id": row["meeting_id"],
+        "participants": participants,
+        "cross_timezone": cross_timezone,
+        "sentiment": sentiment,
+        "action_items": action_items,
+    }, None
+
+
+def build_meeting_participants(conn):
+    columns = ", ".join(f'"{column}"' for column in SOURCE_COLUMNS)
+    rows = conn.execute(f"SELECT rowid, {columns} FROM work_dynamics").fetchall()
+
+    # The loader's quality gate already quarantines most bad rows; anything
+    # left that still fails to parse is appended to the same table.
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS quarantine_work_dynamics AS "
+        f"SELECT {columns}, '' AS reason FROM work_dynamics WHERE 0"
+    )
+    for statement in BRIDGE_SQL:
+        conn.execute(statement)
+
+    pairs = set()
+    load = {}
+    quarantined = []
+    for row in rows:
+        values = dict(zip(SOURCE_COLUMNS, row[1:]))
+        event, reason = parse_work_event(values)
+        if event is None:
+            quarantined.append((row[0], reason, values))
+            continue
+
+        for user_id in event["participants"]:
+            pairs.add((event["meeting_id"], user_id))
+            entry = load.get(user_id)
+            if entry is None:
+                entry = {
+                    "meetings": set(),
+                    "events": 0,
+                    "cross_timezone": 0,
+                    "sentiment_sum": 0.0,
+                    "action_items": 0,
+                }
+                load[user_id] = entry
+            entry["meetings"].add(event["meeting_id"])
+            entry["events"] += 1
+            entry["cross_timezone"] += event["cross_timezone"]
+            entry["sentiment_sum"] += event["sentiment"]
+            entry["action_items"] += event["action_items"]
+
+    conn.executemany(
+        "INSERT INTO meeting_participant (meeting_id, user_id) VALUES (?, ?)",
+        sorted(pairs),
+    )
+    conn.executemany(
+        "INSERT INTO participant_load (user_id, meetings, events, cross_timezone_events, "
+        "cross_timezone_rate, avg_sentiment, action_items_completed) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                user_id,
+                len(entry["meetings"]),
+                entry["events"],
+                entry["cross_timezone"],
+                entry["cross_timezone"] / entry["events"],
+                entry["sentiment_sum"] / entry["events"],
+                entry["action_items"],
+            )
+            for user_id, entry in load.items()
+        ],
+    )
+
+    placeholders = ", ".join("?" for _ in SOURCE_COLUMNS)
+    conn.executemany(
+        f"INSERT INTO quarantine_work_dynamics ({columns}, reason) VALUES ({placeholders}, ?)",
+        [
+            tuple(values[column] for column in SOURCE_COLUMNS) + (reason,)
+            for _, reason, values in quarantined
+        ],
+    )
+    conn.executemany(
+        "DELETE FROM work_dynamics WHERE rowid = ?",
+        [(rowid,) for rowid, _, _ in quarantined],
+    )
+    return {"pairs": len(pairs), "users": len(load), "quarantined": len(quarantined)}
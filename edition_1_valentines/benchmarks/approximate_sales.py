@@ -0,0 +1,109 @@
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from app import db, queries
+from app.data_loader import ensure_db
+from app.sales_sample import build_sales_sample
+from app.sales_wide import ensure_sales_wide_indexes
+
+FILTERS = [
+    {},
+    {"category": "bar"},
+    {"channel": "Online"},
+    {"month": "2025-02"},
+    {"period": "valentine-week"},
+    {"category": "bar", "country": "DE"},
+    {"country": "DE", "channel": "Retail", "month": "2025-02"},
+]
+MEASURES = ("orders", "revenue", "profit", "avg_order")
+
+
+def _scale_sales_wide(conn, copies):
+    # Each copy scales the amounts by a per-row factor between 0.8 and 1.2,
+    # so the copies are not identical rows.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(sales_wide)")]
+    factor = "(0.8 + ((sales_wide.rowid * 2654435761 + copy * 40503) % 1000) / 2500.0)"
+    select = [
+        f"ROUND({name} * {factor}, 2) AS {name}" if name in ("total_amount", "cost_amount") else name
+        for name in columns
+    ]
+    conn.execute(
+        "CREATE TABLE sales_wide_scaled AS "
+        "WITH RECURSIVE copies(copy) AS (SELECT 0 UNION ALL SELECT copy + 1 FROM copies WHERE copy + 1 < ?) "
+        f"SELECT {', '.join(select)} FROM copies, sales_wide ORDER BY date_id",
+        [copies],
+    )
+    conn.execute("DROP TABLE sales_wide")
+    conn.execute("ALTER TABLE sales_wide_scaled RENAME TO sales_wide")
+    ensure_sales_wide_indexes(conn)
+    conn.execute("ANALYZE sales_wide")
+    build_sales_sample(conn)
+    conn.commit()
+
+
+def _timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact vs sampled sales overview: speed and error")
+    parser.add_argument("--copies", type=int, default=100, help="copies of sales_wide to benchmark on")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ensure_db()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        shutil.copyfile(db.DB_PATH, path)
+        conn = sqlite3.connect(path)
+        try:
+            _scale_sales_wide(conn, args.copies)
+            rows = conn.execute("SELECT COUNT(*) FROM sales_wide").fetchone()[0]
+            sampled = conn.execute("SELECT COUNT(*) FROM sales_sample").fetchone()[0]
+        finally:
+            conn.close()
+        db.DB_PATH = path
+
+        print(f"sales_wide rows: {rows}, sample rows: {sampled}")
+        print(f"{'filters':<56} {'exact ms':>9} {'approx ms':>9} {'speedup':>8}  relative error (inside 95% CI)")
+        exact_total = approx_total = 0.0
+        covered = checked = 0
+        for filters in FILTERS:
+            (exact, _), exact_ms = _timed(lambda: queries.sales_overview_filtered.uncached(filters), args.repeat)
+            (approx, _), approx_ms = _timed(
+                lambda: queries.sales_overview_filtered.uncached(filters, approximate=True), args.repeat
+            )
+            exact_total += exact_ms
+            approx_total += approx_ms
+            errors = []
+            for measure in MEASURES:
+                truth = exact[measure] or 0
+                margin = approx["margin"][measure] or 0
+                inside = abs((approx[measure] or 0) - truth) <= margin
+                covered += inside
+                checked += 1
+                error = abs((approx[measure] or 0) - truth) / truth * 100 if truth else 0.0
+                errors.append(f"{measure} {error:.2f}%{'' if inside else '!'}")
+            print(
+                f"{str(filters):<56} {exact_ms:>9.2f} {approx_ms:>9.2f} "
+                f"{exact_ms / max(approx_ms, 1e-9):>7.1f}x  {', '.join(errors)}"
+            )
+        print(
+            f"total: {exact_total:.1f} ms -> {approx_total:.1f} ms "
+            f"({exact_total / max(approx_total, 1e-9):.1f}x); "
+            f"{covered}/{checked} exact values inside the interval"
+        )
+
+
+if __name__ == "__main__":
+    main()
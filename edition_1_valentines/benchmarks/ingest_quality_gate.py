@@ -0,0 +1,89 @@
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app import quality
+from app.data_loader import DATASETS, _table_indexes, parse_dataset, write_dataset
+from app.quality import CHUNK_ROWS
+
+
+def _write_scaled_csv(path, rows):
+    source = pd.read_csv(DATASETS["fact_sales"])
+    copies = -(-rows // len(source))
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        for copy in range(copies):
+            frame = source.copy()
+            frame["sale_id"] = frame["sale_id"] + f"-{copy}"
+            frame.head(rows - copy * len(source)).to_csv(handle, index=False, header=copy == 0)
+
+
+def _plain_load(conn, csv_path):
+    # The same chunked write and indexes as the loader, without the gate.
+    for chunk in pd.read_csv(csv_path, chunksize=CHUNK_ROWS):
+        chunk.to_sql("fact_sales", conn, if_exists="append", index=False)
+    for statement in _table_indexes("fact_sales"):
+        conn.execute(statement)
+
+
+def _timed_gate():
+    # Wraps QualityGate.check to total the time spent in the checks alone
+    # and keep the gate for its seen-key array.
+    timing = {"seconds": 0.0, "gate": None}
+    check = quality.QualityGate.check
+
+    def timed(gate, chunk):
+        start = time.perf_counter()
+        try:
+            return check(gate, chunk)
+        finally:
+            timing["seconds"] += time.perf_counter() - start
+            timing["gate"] = gate
+
+    quality.QualityGate.check = timed
+    return timing, lambda: setattr(quality.QualityGate, "check", check)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest time with and without the quality gate")
+    parser.add_argument("--rows", type=int, default=2000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "fact_sales.csv"
+        _write_scaled_csv(csv_path, args.rows)
+
+        conn = sqlite3.connect(Path(tmp) / "plain.db")
+        try:
+            start = time.perf_counter()
+            _plain_load(conn, csv_path)
+            conn.commit()
+            plain_s = time.perf_counter() - start
+        finally:
+            conn.close()
+
+        timing, restore = _timed_gate()
+        conn = sqlite3.connect(Path(tmp) / "gated.db")
+        try:
+            start = time.perf_counter()
+            report = write_dataset(conn, parse_dataset("fact_sales", csv_path))
+            conn.commit()
+            gated_s = time.perf_counter() - start
+        finally:
+            conn.close()
+            restore()
+
+    seen = timing["gate"].seen_keys
+    print(f"rows: {args.rows}, chunk: {CHUNK_ROWS}")
+    print(f"plain load: {plain_s:.2f} s")
+    print(f"gated load: {gated_s:.2f} s ({(gated_s / plain_s - 1) * 100:+.1f}%)")
+    print(f"gate checks: {timing['seconds']:.2f} s ({timing['seconds'] / plain_s * 100:.1f}% of the plain load)")
+    print(f"seen keys: {len(seen)} hashes, {seen.nbytes / 1024 / 1024:.1f} MiB")
+    print(f"loaded: {report['rows']}, quarantined: {report['quarantined']} {report['reasons']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from app.db import get_db
+from benchmarks.mock_llm import start_mock_llm
+
+# (route, weight, method, build(sample, rng) -> (path, form data or None, json or None))
+# Weights approximate a Valentine's week mix: mostly page views and API
+# reads, a steady share of AI-backed form posts, a few exports. Ingest
+# routes are only added with --writes because they change the database.
+READ_TRAFFIC = [
+    ("GET /", 8, "GET", lambda s, r: ("/", None, None)),
+    ("GET /sales-dashboard", 10, "GET", lambda s, r: (f"/sales-dashboard?{urlencode(r.choice(s['filters']))}", None, None)),
+    ("POST /sales-dashboard/filter", 4, "POST", lambda s, r: ("/sales-dashboard/filter", r.choice(s["filters"]), None)),
+    ("POST /sales-dashboard/chat", 3, "POST", lambda s, r: (
+        "/sales-dashboard/chat", {"question": r.choice(s["questions"])}, None
+    )),
+    ("GET /global-love", 4, "GET", lambda s, r: ("/global-love", None, None)),
+    ("GET /supply-chain", 3, "GET", lambda s, r: ("/supply-chain", None, None)),
+    ("GET /analytics", 2, "GET", lambda s, r: ("/analytics", None, None)),
+    ("GET /participants", 2, "GET", lambda s, r: ("/participants", None, None)),
+    ("GET /love-letter", 3, "GET", lambda s, r: ("/love-letter", None, None)),
+    ("POST /love-letter", 3, "POST", lambda s, r: (
+        "/love-letter", {"customer_id": r.choice(s["customers"]), "tone": "light and professional"}, None
+    )),
+    ("GET /recommender", 3, "GET", lambda s, r: ("/recommender", None, None)),
+    ("POST /recommender", 4, "POST", lambda s, r: ("/recommender", {"customer_id": r.choice(s["customers"])}, None)),
+    ("GET /compatibility", 2, "GET", lambda s, r: ("/compatibility", None, None)),
+    ("POST /compatibility", 3, "POST", lambda s, r: (
+        "/compatibility", dict(zip(("user_a", "user_b"), r.sample(s["users"], 2))), None
+    )),
+    ("GET /gift-concierge", 2, "GET", lambda s, r: ("/gift-concierge", None, None)),
+    ("POST /gift-concierge", 3, "POST", lambda s, r: ("/gift-concierge", r.choice(s["gifts"]), None)),
+    ("GET /order-app", 2, "GET", lambda s, r: ("/order-app", None, None)),
+    ("POST /order-app", 2, "POST", lambda s, r: (
+        "/order-app",
+        {"product_id": r.choice(s["products"]), "quantity": r.randint(1, 6), "loyalty_tier": r.choice(s["tiers"])},
+        None,
+    )),
+    ("GET /semantic-search", 2, "GET", lambda s, r: ("/semantic-search", None, None)),
+    ("POST /semantic-search", 3, "POST", lambda s, r: ("/semantic-search", {"query": r.choice(s["searches"])}, None)),
+    ("GET /valentine-planner", 2, "GET", lambda s, r: ("/valentine-planner", None, None)),
+    ("POST /valentine-planner", 3, "POST", lambda s, r: (
+        "/valentine-planner", dict(r.choice(s["gifts"]), region=r.choice(s["regions"])), None
+    )),
+    ("GET /telemetry/timeseries", 2, "GET", lambda s, r: (
+        f"/telemetry/timeseries?metric={r.choice(['love_notes', 'routing'])}&granularity=minute", None, None
+    )),
+    ("GET /security/alerts", 1, "GET", lambda s, r: ("/security/alerts?limit=20", None, None)),
+    ("GET /api/v1/sales/overview", 4, "GET", lambda s, r: (
+        f"/api/v1/sales/overview?{urlencode(r.choice(s['filters']))}", None, None
+    )),
+    ("GET /api/v1/recommendations", 3, "GET", lambda s, r: (
+        f"/api/v1/recommendations/{r.choice(s['customers'])}", None, None
+    )),
+    ("GET /api/v1/search", 2, "GET", lambda s, r: (f"/api/v1/search?{urlencode({'q': r.choice(s['searches'])})}", None, None)),
+    ("GET /api/v1/supply-chain/alerts", 1, "GET", lambda s, r: ("/api/v1/supply-chain/alerts", None, None)),
+    ("GET /export/sales-products.csv", 1, "GET", lambda s, r: ("/export/sales-products.csv", None, None)),
+]
+
+WRITE_TRAFFIC = [
+    ("POST /telemetry/love-notes", 2, "POST", lambda s, r: (
+        "/telemetry/love-notes", None, {"batch_id": f"LOAD-{uuid.uuid4().hex[:12]}", "events": _love_notes(s, r)}
+    )),
+    ("POST /telemetry/routing", 1, "POST", lambda s, r: (
+        "/telemetry/routing", None, {"samples": r.sample(s["routing"], min(5, len(s["routing"])))}
+    )),
+    ("POST /moderation/score", 2, "POST", lambda s, r: (
+        "/moderation/score", None, {"messages": r.sample(s["messages"], min(8, len(s["messages"])))}
+    )),
+    ("POST /security/logins", 2, "POST", lambda s, r: ("/security/logins", None, {"events": _logins(r)})),
+]
+
+
+def _love_notes(sample, rng):
+    events = []
+    for row in rng.sample(sample["notes"], min(10, len(sample["notes"]))):
+        events.append(dict(row, message_id=f"LOAD-{uuid.uuid4().hex[:12]}"))
+    return events
+
+
+def _logins(rng):
+    now = time.time()
+    return [
+        {
+            "user_id": f"U{rng.randint(1, 500):04d}",
+            "ip_address": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "geo": rng.choice(["US", "DE", "FR", "JP", "BR"]),
+            "failed_attempts": rng.choice([0, 0, 0, 1, 3]),
+            "risk_score": round(rng.random(), 2),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "MFA_result": rng.choice(["success", "success", "failed"]),
+        }
+        for _ in range(5)
+    ]
+
+
+def load_sample():
+    # Request parameters drawn from the local database.
+    conn = get_db()
+    try:
+        def values(sql):
+            return [row[0] for row in conn.execute(sql).fetchall()]
+
+        sample = {
+            "customers": values("SELECT customer_id FROM dim_customer ORDER BY customer_id LIMIT 200"),
+            "users": values("SELECT user_id FROM matchmaking ORDER BY user_id LIMIT 100"),
+            "products": values("SELECT product_id FROM dim_product ORDER BY product_id"),
+            "regions": values("SELECT DISTINCT region FROM global_routing ORDER BY region"),
+            "tiers": values("SELECT DISTINCT loyalty_tier FROM dim_customer ORDER BY loyalty_tier"),
+            "gifts": [
+                {"budget": round(row["budget"], 2), "persona": row["gift_persona"], "delivery_speed": row["delivery_speed"]}
+                for row in conn.execute(
+                    "SELECT gift_persona, delivery_speed, AVG(list_price) AS budget FROM gift_recommender "
+                    "GROUP BY gift_persona, delivery_speed"
+                ).fetchall()
+            ],
+            "notes": [
+                dict(row)
+                for row in conn.execute(
+                    "SELECT message_id, region_origin, region_destination, latency_ms, retry_count, "
+                    "delivery_status, device_type, network_speed_mbps, timestamp "
+                    "FROM love_notes_telemetry LIMIT 200"
+                ).fetchall()
+            ],
+            "routing": [
+                dict(row)
+                for row in conn.execute(
+                    "SELECT region, request_count_per_min, p95_latency_ms, failure_rate FROM global_routing"
+                ).fetchall()
+            ],
+        }
+        categories = values("SELECT DISTINCT category FROM dim_product ORDER BY category")
+        countries = values("SELECT DISTINCT country_code FROM dim_store ORDER BY country_code")
+    finally:
+        conn.close()
+
+    sample["filters"] = [
+        {},
+        {},
+        {"category": categories[0]},
+        {"country": countries[0]},
+        {"month": "2025-02"},
+        {"period": "valentine-week"},
+        {"approximate": "1"},
+    ]
+    sample["questions"] = [
+        "Which categories drive revenue?",
+        "What is the latest monthly trend?",
+        "Which channel performs best?",
+    ]
+    sample["searches"] = ["dark chocolate gift for her", "vegan truffles", "roses and pralines", "something fun"]
+    sample["messages"] = ["Happy Valentine's Day!", "You are wonderful", "send me your password", "see you soon"]
+    return sample
+
+
+class InProcessClient:
+    # The app under a TestClient, shared by every worker thread; requests go
+    # through one event loop and sync routes run in its threadpool, as with
+    # a single uvicorn worker.
+    def __init__(self):
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        self.client = TestClient(app)
+        self.client.__enter__()
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.client.request(method, path, data=data, json=json_body)
+        return response.status_code, len(response.content)
+
+    def close(self):
+        self.client.__exit__(None, None, None)
+
+
+class HttpClient:
+    # One keep-alive connection per worker thread.
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.local.conn = conn
+        return conn
+
+    def request(self, method, path, data=None, json_body=None):
+        headers = {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json.dumps(json_body)
+            headers["Content-Type"] = "application/json"
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, len(response.read())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+
+    def close(self):
+        pass
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _latency(samples):
+    return {
+        "p50_ms": _percentile(samples, 0.50),
+        "p95_ms": _percentile(samples, 0.95),
+        "p99_ms": _percentile(samples, 0.99),
+    }
+
+
+def run_level(client, traffic, sample, concurrency, duration, seed):
+    # Closed loop: each worker sends its next request as soon as the last
+    # one returns, for `duration` seconds.
+    records = []
+    lock = threading.Lock()
+    weights = [item[1] for item in traffic]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local = []
+        while time.perf_counter() < deadline:
+            route, _, method, build = rng.choices(traffic, weights)[0]
+            path, data, json_body = build(sample, rng)
+            start = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, data, json_body)
+            except Exception:
+                status = None
+            local.append((route, (time.perf_counter() - start) * 1000, status))
+        with lock:
+            records.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, latency, status in records:
+        entry = routes.setdefault(route, {"latencies": [], "errors": 0})
+        entry["latencies"].append(latency)
+        if status is None or status >= 500:
+            entry["errors"] += 1
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": len(records),
+        "rps": round(len(records) / elapsed, 1),
+        "errors": sum(entry["errors"] for entry in routes.values()),
+        **_latency([latency for _, latency, _ in records]),
+        "routes": {
+            route: {"requests": len(entry["latencies"]), "errors": entry["errors"], **_latency(entry["latencies"])}
+            for route, entry in sorted(routes.items())
+        },
+    }
+
+
+def _ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def print_level(level):
+    print(
+        f"\nconcurrency {level['concurrency']}: {level['requests']} requests in {level['seconds']} s, "
+        f"{level['rps']} req/s, {level['errors']} errors, "
+        f"p50 {_ms(level['p50_ms'])} / p95 {_ms(level['p95_ms'])} / p99 {_ms(level['p99_ms'])} ms"
+    )
+    if "llm" in level:
+        print(f"  mock LLM: {level['llm']['calls']} calls, {level['llm']['errors']} failed on purpose")
+    print(f"  {'route':<34} {'reqs':>6} {'errs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, row in level["routes"].items():
+        print(
+            f"  {route:<34} {row['requests']:>6} {row['errors']:>5} "
+            f"{_ms(row['p50_ms']):>9} {_ms(row['p95_ms']):>9} {_ms(row['p99_ms']):>9}"
+        )
+
+
+def saturation(levels, gain=1.1):
+    # The first level where adding workers raised throughput by less than
+    # 10%: past it, extra concurrency only adds queueing delay.
+    for previous, level in zip(levels, levels[1:]):
+        if level["rps"] < previous["rps"] * gain:
+            return {
+                "concurrency": previous["concurrency"],
+                "rps": previous["rps"],
+                "p95_ms_before": previous["p95_ms"],
+                "p95_ms_after": level["p95_ms"],
+                "next_concurrency": level["concurrency"],
+            }
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test every route with a mock LLM behind the AI paths")
+    parser.add_argument("--url", help="app base URL, e.g. http://127.0.0.1:8000; default runs the app in-process")
+    parser.add_argument("--concurrency", default="1,4,16,32")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--writes", action="store_true", help="include the ingest routes (they write to the database)")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--llm-port", type=int, default=8099, help="mock LLM port when testing over --url")
+    parser.add_argument("--no-llm", action="store_true", help="leave the LLM unconfigured and test the heuristic paths")
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    server = None
+    if not args.no_llm:
+        server = start_mock_llm(
+            port=args.llm_port if args.url else 0,
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            error_rate=args.llm_error_rate,
+            seed=args.seed,
+        )
+        if args.url:
+            print(f"mock LLM on {server.base_url}; the app must run with")
+            print(f"  OPENAI_API_KEY=mock OPENAI_BASE_URL={server.base_url}")
+        else:
+            # ai.py reads these on every call; Azure settings would win.
+            for name in ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT"):
+                os.environ.pop(name, None)
+            os.environ["OPENAI_API_KEY"] = "mock"
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    elif not args.url:
+        for name in ("OPENAI_API_KEY", "AZURE_OPENAI_API_KEY"):
+            os.environ.pop(name, None)
+
+    client = HttpClient(args.url) if args.url else InProcessClient()
+    sample = load_sample()
+    traffic = READ_TRAFFIC + (WRITE_TRAFFIC if args.writes else [])
+    levels = []
+    llm_seen = {"calls": 0, "errors": 0}
+    try:
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            level = run_level(client, traffic, sample, concurrency, args.duration, args.seed)
+            if server is not None:
+                stats = server.stats()
+                level["llm"] = {key: stats[key] - llm_seen[key] for key in stats}
+                llm_seen = stats
+            levels.append(level)
+            print_level(level)
+    finally:
+        client.close()
+        if server is not None:
+            server.shutdown()
+
+    print("\nconcurrency      req/s     p95 ms     p99 ms  errors")
+    for level in levels:
+        print(
+            f"{level['concurrency']:>11} {level['rps']:>10} {_ms(level['p95_ms']):>10} "
+            f"{_ms(level['p99_ms']):>10} {level['errors']:>7}"
+        )
+    saturated = saturation(levels)
+    if saturated:
+        print(
+            f"throughput flattens at concurrency {saturated['concurrency']} ({saturated['rps']} req/s); "
+            f"at {saturated['next_concurrency']} p95 goes {_ms(saturated['p95_ms_before'])} -> "
+            f"{_ms(saturated['p95_ms_after'])} ms"
+        )
+    else:
+        print("throughput still rising at the highest concurrency tested")
+
+    if args.json:
+        report = {
+            "target": args.url or "in-process",
+            "llm": None if args.no_llm else {
+                "latency_ms": args.llm_latency_ms,
+                "jitter_ms": args.llm_jitter_ms,
+                "error_rate": args.llm_error_rate,
+            },
+            "duration": args.duration,
+            "levels": levels,
+            "saturation": saturated,
+        }
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A stand-in for the OpenAI chat completions endpoint. It answers
+# POST .../chat/completions after a configurable delay and fails a
+# configurable share of calls, so load tests exercise the AI paths (and
+# their fallbacks) without calling a real model.
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=800.0, jitter_ms=200.0, error_rate=0.0, seed=None):
+        super().__init__(address, MockLLMHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_reply(self):
+        # Returns (delay in seconds, failed?) for one call.
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return delay, failed
+
+    def stats(self):
+        with self.lock:
+            return {"calls": self.calls, "errors": self.errors}
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        delay, failed = self.server.next_reply()
+        time.sleep(delay)
+        if failed:
+            self._send(500, {"error": {"message": "Mock server error", "type": "server_error"}})
+            return
+
+        try:
+            messages = json.loads(body or b"{}").get("messages") or []
+        except ValueError:
+            messages = []
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = f"Mock answer ({len(prompt)} prompt characters): chocolate makes everything better."
+        self._send(
+            200,
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+            },
+        )
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_llm(host="127.0.0.1", port=0, latency_ms=800.0, jitter_ms=200.0, error_rate=0.0, seed=None):
+    # Serves from a daemon thread; call server.shutdown() to stop it.
+    server = MockLLMServer((host, port), latency_ms, jitter_ms, error_rate, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"mock LLM on {server.base_url}; start the app with")
+    print(f"  OPENAI_API_KEY=mock OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
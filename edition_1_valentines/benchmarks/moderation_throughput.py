@@ -0,0 +1,68 @@
+import argparse
+import random
+import time
+
+from app.data_loader import ensure_db
+from app.db import get_db
+from app.moderation import (
+    MODEL_PATH,
+    load_moderation_model,
+    save_moderation_model,
+    score_messages,
+    train_moderation_model,
+)
+
+
+def _sample_messages(total, seed=7):
+    conn = get_db()
+    try:
+        texts = [
+            row[0]
+            for row in conn.execute(
+                "SELECT message_text FROM trust_safety WHERE message_text IS NOT NULL"
+            ).fetchall()
+        ]
+    finally:
+        conn.close()
+
+    rng = random.Random(seed)
+    return [rng.choice(texts) for _ in range(total)]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moderation scoring throughput")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch-sizes", default="1,100,1000,10000")
+    args = parser.parse_args()
+
+    ensure_db()
+
+    model, train_s = _timed(train_moderation_model)
+    save_moderation_model(model)
+    load_moderation_model.cache_clear()
+    _, load_s = _timed(load_moderation_model)
+    print(f"train: {train_s * 1000:.1f} ms, load artifact ({MODEL_PATH.name}): {load_s * 1000:.1f} ms")
+
+    messages = _sample_messages(args.messages)
+    for batch_size in [int(item) for item in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        scored = 0
+        for offset in range(0, len(messages), batch_size):
+            scored += len(score_messages(messages[offset:offset + batch_size]))
+            if batch_size == 1 and scored >= 2000:
+                break
+        elapsed = time.perf_counter() - start
+        print(
+            f"batch={batch_size:>6}  messages={scored:>7}  "
+            f"{scored / elapsed:>10.0f} msg/s  {elapsed * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import argparse
+import json
+import math
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app import db, queries
+from app.cache import bump_version
+from app.data_loader import DERIVED_TABLES, ensure_db
+from app.sales_sample import build_sales_sample
+from app.sales_wide import build_sales_wide
+
+# Tables copied to build the larger fixtures, with the key column that gets
+# a per-copy suffix. sales_wide, sales_sample and the derived tables of the
+# copied sources are rebuilt from them.
+FIXTURE_TABLES = {
+    "fact_sales": "sale_id",
+    "gift_recommender": "event_id",
+    "supply_chain": "order_id",
+    "love_notes_telemetry": "message_id",
+}
+
+SALES_FILTERS = {"category": "", "channel": "", "country": "", "month": "2025-02"}
+
+
+def _scale(conn, copies):
+    for table, key in FIXTURE_TABLES.items():
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        select = [f"{name} || '-' || copy" if name == key else name for name in columns]
+        conn.execute(f"CREATE TEMP TABLE base AS SELECT * FROM {table}")
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            "WITH RECURSIVE copies(copy) AS (SELECT 1 UNION ALL SELECT copy + 1 FROM copies WHERE copy + 1 < ?) "
+            f"SELECT {', '.join(select)} FROM copies, base",
+            [copies],
+        )
+        conn.execute("DROP TABLE base")
+    build_sales_wide(conn)
+    build_sales_sample(conn)
+    for table, sources, build in DERIVED_TABLES:
+        if set(sources) & set(FIXTURE_TABLES):
+            build(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def build_fixture(directory, copies):
+    # A copy of the app database with the fact tables repeated `copies` times.
+    path = Path(directory) / f"queries-x{copies}.db"
+    shutil.copyfile(db.DB_PATH, path)
+    if copies > 1:
+        conn = sqlite3.connect(path)
+        try:
+            _scale(conn, copies)
+        finally:
+            conn.close()
+    return path
+
+
+def fixture_params():
+    # Representative arguments read from the fixture itself: the busiest
+    # customer, the most common gift profile, and so on.
+    conn = db.get_db()
+    try:
+        customer_id = conn.execute(
+            "SELECT customer_id FROM fact_sales GROUP BY customer_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        user_a, user_b = [row[0] for row in conn.execute("SELECT user_id FROM matchmaking ORDER BY user_id LIMIT 2")]
+        gift = conn.execute(
+            "SELECT gift_persona, delivery_speed, AVG(list_price) AS budget FROM gift_recommender "
+            "GROUP BY gift_persona, delivery_speed ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        product_id = conn.execute("SELECT product_id FROM dim_product ORDER BY product_id LIMIT 1").fetchone()[0]
+        region = conn.execute("SELECT region FROM global_routing ORDER BY region LIMIT 1").fetchone()[0]
+        participant = conn.execute(
+            "SELECT user_id FROM participant_load ORDER BY meetings DESC LIMIT 1"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    # The cursor of the second page, so paging filters the product list.
+    products = queries.sales_dashboard_snapshot(SALES_FILTERS)["products"]
+    _, products_after = queries.sales_products_page(products, 25)
+    return {
+        "customer_id": customer_id,
+        "user_a": user_a,
+        "user_b": user_b,
+        "budget": round(gift["budget"], 2),
+        "persona": gift["gift_persona"],
+        "delivery_speed": gift["delivery_speed"],
+        "product_id": product_id,
+        "region": region,
+        "participant": participant,
+        "products_after": products_after,
+    }
+
+
+def _sales_rows():
+    conn = db.get_db()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM fact_sales").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _uncached(fn):
+    return getattr(fn, "uncached", fn)
+
+
+# name -> call(params). Cached functions are called through .uncached so
+# every run does the work; helpers they call keep their shared cache, as in
+# the app. love_letter_with_ai is left out because it always calls the LLM.
+CASES = {
+    "count_rows": lambda p: _uncached(queries.count_rows)("dim_customer"),
+    "list_customers": lambda p: queries.list_customers(50),
+    "list_products": lambda p: queries.list_products(50),
+    "list_matchmaking_users": lambda p: queries.list_matchmaking_users(50),
+    "list_regions": lambda p: queries.list_regions(50),
+    "love_letter_data": lambda p: queries.love_letter_data(p["customer_id"]),
+    "recommend_products": lambda p: queries.recommend_products(p["customer_id"], 5),
+    "recommend_products_with_explanations": lambda p: queries.recommend_products_with_explanations(
+        p["customer_id"], 5
+    ),
+    "compatibility_score": lambda p: queries.compatibility_score(p["user_a"], p["user_b"]),
+    "sales_overview": lambda p: _uncached(queries.sales_overview)(),
+    "sales_filter_options": lambda p: _uncached(queries.sales_filter_options)(),
+    "sales_overview_filtered": lambda p: _uncached(queries.sales_overview_filtered)(SALES_FILTERS),
+    "sales_overview_filtered_approximate": lambda p: _uncached(queries.sales_overview_filtered)(
+        SALES_FILTERS, approximate=True
+    ),
+    "sales_all_products": lambda p: queries.sales_all_products(SALES_FILTERS, 25),
+    "sales_product_count": lambda p: _uncached(queries.sales_product_count)(SALES_FILTERS),
+    "sales_dashboard_snapshot": lambda p: _uncached(queries.sales_dashboard_snapshot)(SALES_FILTERS),
+    "sales_products_page": lambda p: queries.sales_products_page(
+        queries.sales_dashboard_snapshot(SALES_FILTERS)["products"], 25, p["products_after"]
+    ),
+    "sales_chat_context": lambda p: queries.sales_chat_context(SALES_FILTERS),
+    "sales_chat_answer": lambda p: queries.sales_chat_answer("Which categories drive revenue?", SALES_FILTERS),
+    "global_love_metrics": lambda p: _uncached(queries.global_love_metrics)(),
+    "participant_analytics": lambda p: queries.participant_analytics(50),
+    "participant_meetings": lambda p: queries.participant_meetings(p["participant"]),
+    "supply_chain_alerts": lambda p: _uncached(queries.supply_chain_alerts)(10),
+    # supply_chain_risk scores one row; the case scores every supply_chain
+    # row the way the experience planner does.
+    "supply_chain_risk": lambda p: queries._supply_chain_risk_map(),
+    "gift_concierge": lambda p: queries.gift_concierge(p["budget"], p["persona"], p["delivery_speed"]),
+    "semantic_product_search": lambda p: queries.semantic_product_search("dark chocolate gift for her"),
+    "valentine_experience_plan": lambda p: queries.valentine_experience_plan(
+        p["budget"], p["persona"], p["delivery_speed"], p["region"]
+    ),
+    "order_quote": lambda p: queries.order_quote(p["product_id"], 3, "Gold"),
+    "analytics_overview": lambda p: _uncached(queries.analytics_overview)(),
+    "quarantine_summary": lambda p: queries.quarantine_summary(),
+}
+
+
+def _patch_get_db(statements):
+    # Every app module that imported get_db gets one that traces its SQL.
+    original = db.get_db
+
+    def traced_get_db(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    modules = [
+        module
+        for name, module in sys.modules.items()
+        if name.startswith("app.") and getattr(module, "get_db", None) is original
+    ]
+    for module in modules:
+        module.get_db = traced_get_db
+    return lambda: [setattr(module, "get_db", original) for module in modules]
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(call, params, repeat):
+    call(params)
+
+    statements = []
+    restore = _patch_get_db(statements)
+    try:
+        call(params)
+    finally:
+        restore()
+
+    tracemalloc.start()
+    try:
+        call(params)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call(params)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(_percentile(samples, 0.50), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+        "statements": len(statements),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {(row["function"], row["copies"]): row for row in baseline["results"]}
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}), p95 change over {threshold:.0f}% flagged:")
+    regressions = 0
+    for row in results:
+        old = previous.get((row["function"], row["copies"]))
+        if not old or not old["p95_ms"]:
+            continue
+        change = (row["p95_ms"] / old["p95_ms"] - 1) * 100
+        flag = change > threshold
+        regressions += flag
+        if flag or row["statements"] != old["statements"]:
+            print(
+                f"{row['function']:<38} x{row['copies']:<4} p95 {old['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms "
+                f"({change:+.0f}%), statements {old['statements']} -> {row['statements']}"
+            )
+    print(f"{regressions} regression(s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, SQL statements and peak memory of every query function")
+    parser.add_argument("--copies", default="1,10", help="fixture sizes, as copies of the fact tables")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--only", help="comma-separated function names to run")
+    parser.add_argument("--output", default="query_suite.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 slowdown in percent that counts as a regression")
+    args = parser.parse_args()
+
+    cases = CASES
+    if args.only:
+        cases = {name: CASES[name] for name in args.only.split(",")}
+
+    ensure_db()
+    app_db = db.DB_PATH
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for copies in [int(value) for value in args.copies.split(",")]:
+                db.DB_PATH = app_db
+                path = build_fixture(tmp, copies)
+                db.DB_PATH = path
+                bump_version()
+                params = fixture_params()
+                sales_rows = _sales_rows()
+                print(f"\nfixture x{copies}: {sales_rows} sales")
+                print(f"{'function':<38} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'stmts':>6} {'peak KiB':>9}")
+                for name, call in cases.items():
+                    row = measure(call, params, args.repeat)
+                    print(
+                        f"{name:<38} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                        f"{row['statements']:>6} {row['peak_kib']:>9.1f}"
+                    )
+                    results.append({"function": name, "copies": copies, "sales_rows": sales_rows, **row})
+        finally:
+            # Results computed against the fixtures must not outlive them.
+            db.DB_PATH = app_db
+            bump_version()
+
+    report = {
+        "commit": _commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {args.output}")
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import time
+
+from app import queries
+from app.data_loader import ensure_db
+from app.db import get_db
+
+FILTERS = [
+    {},
+    {"category": "bar"},
+    {"channel": "Online"},
+    {"month": "2025-02"},
+    {"category": "bar", "country": "DE"},
+    {"channel": "Retail", "season": "Winter"},
+]
+
+
+def _old_path(filters):
+    summary, top_products = queries.sales_overview_filtered.uncached(filters)
+    all_products, _ = queries.sales_all_products(filters, 25)
+    return summary, top_products, all_products
+
+
+def _new_path(filters):
+    dashboard = queries.sales_dashboard_snapshot.uncached(filters)
+    all_products, _ = queries.sales_products_page(dashboard["products"], 25)
+    return dashboard["summary"], dashboard["top_products"], all_products
+
+
+def measure(path, filters):
+    # Work is counted, not estimated: SQLite calls the progress handler on
+    # every VM instruction, so the total is the steps each path really ran,
+    # including the rows every scan read and the grouping and sorting.
+    # A first run fills the shared-cache helpers (date ranges) both paths
+    # use, so neither is charged for them.
+    path(filters)
+    statements = []
+    steps = [0]
+
+    def traced_get_db():
+        conn = get_db()
+        conn.set_trace_callback(statements.append)
+        conn.set_progress_handler(lambda: steps.__setitem__(0, steps[0] + 1), 1)
+        return conn
+
+    queries.get_db = traced_get_db
+    try:
+        path(filters)
+    finally:
+        queries.get_db = get_db
+
+    start = time.perf_counter()
+    path(filters)
+    return {
+        "statements": len(statements),
+        "vm_steps": steps[0],
+        "ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Three dashboard queries vs one snapshot query")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ensure_db()
+    print(f"{'filters':<42} {'path':<5} {'stmts':>5} {'vm steps':>10} {'ms':>8}")
+    totals = {"old": 0, "new": 0}
+    for filters in FILTERS:
+        for name, path in (("old", _old_path), ("new", _new_path)):
+            runs = [measure(path, filters) for _ in range(args.repeat)]
+            row = runs[0]
+            row["ms"] = min(run["ms"] for run in runs)
+            totals[name] += row["vm_steps"]
+            print(
+                f"{str(filters):<42} {name:<5} {row['statements']:>5} "
+                f"{row['vm_steps']:>10} {row['ms']:>8.2f}"
+            )
+    print(f"vm steps: {totals['old']} -> {totals['new']} ({totals['old'] / max(totals['new'], 1):.1f}x fewer)")
+
+
+if __name__ == "__main__":
+    main()
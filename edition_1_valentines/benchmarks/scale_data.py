@@ -0,0 +1,200 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.data_loader import DATA_ROOT, DATASETS, ensure_db, parse_dataset
+from app.quality import CHUNK_ROWS
+
+# How each dataset grows by a factor N. The output is N blocks; block 0 is
+# the shipped data and every other block is a relabelled version of it:
+#   entity - each row copied once per block, so every key exists N times over
+#   event  - rows resampled with replacement, which keeps the joint
+#            distribution of the columns (persona x rating, region x latency)
+#   fixed  - written once; dim_date is the calendar, not sample data
+# "ids" get the block number spliced into their digits (C00144 -> C300144 in
+# block 3). "refs" point at another table's key and are relabelled the same
+# way, or left alone when that table is fixed, so every foreign key resolves.
+# "lists" are JSON lists of refs.
+SPECS = {
+    "dim_customer": {"kind": "entity", "ids": ["customer_id"]},
+    "dim_date": {"kind": "fixed"},
+    "dim_product": {"kind": "entity", "ids": ["product_id"]},
+    "dim_promotion": {"kind": "entity", "ids": ["promotion_id"]},
+    "dim_store": {"kind": "entity", "ids": ["store_id"]},
+    "dim_supplier": {"kind": "entity", "ids": ["supplier_id"]},
+    "fact_sales": {
+        "kind": "event",
+        "ids": ["sale_id", "payment_token"],
+        "refs": {
+            "product_id": "dim_product",
+            "customer_id": "dim_customer",
+            "store_id": "dim_store",
+            "promotion_id": "dim_promotion",
+            "supplier_id": "dim_supplier",
+        },
+    },
+    "gift_recommender": {"kind": "event", "ids": ["event_id"], "refs": {"customer_id": "dim_customer"}},
+    "supply_chain": {"kind": "event", "ids": ["order_id"], "refs": {"product_id": "dim_product"}},
+    "matchmaking": {"kind": "entity", "ids": ["user_id"]},
+    "behavior_edges": {
+        "kind": "event",
+        "ids": ["edge_id"],
+        "refs": {"source_user_id": "matchmaking", "target_user_id": "matchmaking"},
+    },
+    "broken_hearts_security": {
+        "kind": "event",
+        "ids": ["security_audit_id", "login_attempt_id"],
+        "refs": {"user_id": "matchmaking"},
+    },
+    "trust_safety": {"kind": "event", "ids": ["message_id"]},
+    "global_routing": {"kind": "event", "ids": ["routing_id"]},
+    "love_notes_telemetry": {"kind": "event", "ids": ["message_id", "batch_id"]},
+    "work_dynamics": {
+        "kind": "event",
+        "ids": ["event_id", "meeting_id"],
+        "lists": {"participant_ids": "matchmaking"},
+    },
+}
+
+
+def relabel(values, block):
+    # Keys end in zero-padded digits, so putting the block number in front
+    # of them gives a key that is unique per block and still matches the
+    # quality gate's patterns (U\d+, MTG\d+, ...).
+    if block == 0:
+        return values
+    text = values.astype("string")
+    parts = text.str.extract(r"^(.*?)(\d+)$")
+    relabelled = (parts[0] + str(block) + parts[1]).fillna(text + f"-{block}")
+    return relabelled.where(values.notna(), None).astype(object)
+
+
+def relabel_lists(values, block):
+    if block == 0:
+        return values
+    return values.astype("string").str.replace(r'"([^"]*?)(\d+)"', rf'"\g<1>{block}\g<2>"', regex=True)
+
+
+def _load_source(table):
+    # The shipped rows that pass the quality gate, with its type coercions.
+    parsed = parse_dataset(table, DATASETS[table])
+    frames = [valid for valid, _ in parsed["chunks"]]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def make_block(source, spec, block, fixed, rng):
+    if block == 0:
+        return source
+    key = spec["ids"][0]
+    if spec["kind"] == "event":
+        # Rows are drawn at random, keys by position so they stay unique.
+        frame = source.iloc[rng.integers(0, len(source), size=len(source))].reset_index(drop=True)
+        frame[key] = source[key].to_numpy()
+    else:
+        frame = source.copy()
+    for column in spec["ids"]:
+        if column in frame:
+            frame[column] = relabel(frame[column], block)
+    for column, parent in spec.get("refs", {}).items():
+        if column in frame and parent not in fixed:
+            frame[column] = relabel(frame[column], block)
+    for column, parent in spec.get("lists", {}).items():
+        if column in frame and parent not in fixed:
+            frame[column] = relabel_lists(frame[column], block)
+    return frame
+
+
+def generate(table, factor, fixed, seed, chunk_rows=CHUNK_ROWS):
+    # Yields DataFrames of about chunk_rows rows; only the shipped table and
+    # one chunk are held in memory, whatever the factor.
+    spec = SPECS[table]
+    source = _load_source(table)
+    blocks = 1 if table in fixed or source.empty else factor
+    rng = np.random.default_rng([seed, list(SPECS).index(table)])
+    pending = []
+    pending_rows = 0
+    for block in range(blocks):
+        frame = make_block(source, spec, block, fixed, rng)
+        pending.append(frame)
+        pending_rows += len(frame)
+        if pending_rows >= chunk_rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending = []
+            pending_rows = 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def write_csv(out_dir, table, chunks):
+    # Same layout as data/, so VALENTINES_DATA_ROOT=out_dir loads it.
+    path = Path(out_dir) / DATASETS[table].relative_to(DATA_ROOT)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        for chunk in chunks:
+            chunk.to_csv(handle, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+
+def write_sqlite(conn, table, chunks):
+    # Rows are valid by construction, so they skip the quality gate.
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    rows = 0
+    for chunk in chunks:
+        chunk.to_sql(table, conn, if_exists="append", index=False)
+        conn.commit()
+        rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale every dataset by a factor, keeping foreign keys valid")
+    parser.add_argument("--factor", type=int, required=True)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv", help="directory to write CSVs to, laid out like data/")
+    target.add_argument("--sqlite", help="new SQLite database to load, then index and build derived tables")
+    parser.add_argument("--fixed", default="", help="extra comma-separated tables to keep at their shipped size")
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    fixed = {table for table, spec in SPECS.items() if spec["kind"] == "fixed"}
+    fixed |= {table for table in args.fixed.split(",") if table}
+    unknown = fixed - set(SPECS)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+
+    conn = None
+    if args.sqlite:
+        if Path(args.sqlite).exists():
+            parser.error(f"{args.sqlite} exists; pick a new path")
+        conn = sqlite3.connect(args.sqlite)
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+
+    try:
+        for table in SPECS:
+            start = time.perf_counter()
+            chunks = generate(table, args.factor, fixed, args.seed, args.chunk_rows)
+            if conn is not None:
+                rows = write_sqlite(conn, table, chunks)
+            else:
+                rows = write_csv(args.csv, table, chunks)
+            print(f"{table:<24} {rows:>12} rows {time.perf_counter() - start:>8.1f} s")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if args.sqlite:
+        start = time.perf_counter()
+        ensure_db(args.sqlite)
+        print(f"{'indexes + derived':<24} {'':>12}      {time.perf_counter() - start:>8.1f} s")
+
+
+if __name__ == "__main__":
+    main()
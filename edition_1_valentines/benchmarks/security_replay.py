@@ -0,0 +1,119 @@
+import argparse
+import csv
+import json
+import time
+import urllib.request
+
+from app.data_loader import DATASETS
+from app.rollups import parse_timestamp
+from app.security_stream import LoginAnomalyDetector
+
+
+def _realign(row):
+    # Most rows in the shipped CSV are missing login_attempt_id, which shifts
+    # every later column one place to the left.
+    login_attempt_id = row.get("login_attempt_id") or ""
+    if not login_attempt_id.startswith("U"):
+        return row
+    return {
+        "security_audit_id": row["security_audit_id"],
+        "login_attempt_id": None,
+        "user_id": login_attempt_id,
+        "ip_address": row["user_id"],
+        "geo": row["ip_address"],
+        "failed_attempts": row["geo"],
+        "risk_score": row["failed_attempts"],
+        "timestamp": row["risk_score"],
+        "device_compliance_status": row["timestamp"],
+        "MFA_result": row["device_compliance_status"],
+    }
+
+
+def load_events(path):
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [_realign(row) for row in csv.DictReader(handle)]
+
+
+def replay(events, repeat, end):
+    # Rounds follow each other in time and the last one ends at `end`.
+    times = [parse_timestamp(event["timestamp"]) for event in events]
+    last = max(t for t in times if t is not None)
+    span = last - min(t for t in times if t is not None) + 1
+    for round_no in range(repeat):
+        offset = end - last - (repeat - 1 - round_no) * span
+        for event, ts in zip(events, times):
+            if ts is None:
+                yield event
+                continue
+            shifted = dict(event)
+            shifted["timestamp"] = ts + offset
+            yield shifted
+
+
+def _post(url, batch):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps({"events": batch}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay broken_hearts_security logins")
+    parser.add_argument("--csv", default=str(DATASETS["broken_hearts_security"]))
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--url",
+        default="",
+        help="POST batches to a running app, e.g. http://127.0.0.1:8000/security/logins",
+    )
+    args = parser.parse_args()
+
+    events = load_events(args.csv)
+    # The app rejects timestamps outside the rollup retention, so a posted
+    # replay ends now and its rounds older than that count as rejected. The
+    # local detector follows the replay's own clock instead.
+    end = int(time.time())
+    clock = {"now": end}
+    detector = LoginAnomalyDetector(clock=lambda: clock["now"])
+    processed = 0
+    rejected = 0
+    alerts = {}
+    batch = []
+
+    def flush():
+        nonlocal processed, rejected
+        if not batch:
+            return
+        result = _post(args.url, batch) if args.url else detector.process_batch(batch)
+        processed += result["processed"]
+        rejected += result["rejected"]
+        for alert in result["alerts"]:
+            alerts[alert["rule"]] = alerts.get(alert["rule"], 0) + 1
+        batch.clear()
+
+    start = time.perf_counter()
+    for event in replay(events, args.repeat, end):
+        # A batch is checked against its latest event.
+        ts = event["timestamp"]
+        if isinstance(ts, int):
+            clock["now"] = max(clock["now"], ts) if batch else ts
+        batch.append(event)
+        if len(batch) >= args.batch_size:
+            flush()
+    flush()
+    elapsed = time.perf_counter() - start
+
+    print(f"events: {processed + rejected} (processed {processed}, rejected {rejected})")
+    print(f"elapsed: {elapsed:.2f} s, throughput: {(processed + rejected) / elapsed:,.0f} events/s")
+    print(f"alerts: {json.dumps(alerts, sort_keys=True)}")
+    if not args.url:
+        print(f"state: {json.dumps(detector.stats(), sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
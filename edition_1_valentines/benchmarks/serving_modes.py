@@ -0,0 +1,114 @@
+import argparse
+import multiprocessing
+import resource
+import time
+
+from app.data_loader import ensure_db
+
+MODES = {
+    "rw": ("rw", 0),
+    "ro+mmap": ("ro", 256 * 1024 * 1024),
+    "immutable+mmap": ("immutable", 256 * 1024 * 1024),
+}
+
+
+def _rss_kb():
+    # RssFile counts mmap'd database pages that live in the shared page
+    # cache; RssAnon is memory private to the worker.
+    try:
+        with open("/proc/self/status", encoding="utf-8") as handle:
+            fields = dict(line.split(":", 1) for line in handle)
+        return {
+            key: int(fields[key].split()[0])
+            for key in ("VmRSS", "RssAnon", "RssFile")
+            if key in fields
+        }
+    except OSError:
+        return {"VmRSS": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def _worker(mode, mmap_size, seconds, ready, start, results):
+    from app import db
+
+    db.set_read_mode(mode)
+    db.MMAP_SIZE = mmap_size
+
+    from app.queries import (
+        analytics_overview,
+        global_love_metrics,
+        sales_all_products,
+        sales_overview,
+        supply_chain_alerts,
+    )
+
+    # Cached functions are called through .uncached; otherwise every mode
+    # would be timing shared-cache hits instead of SQLite reads.
+    queries = [
+        analytics_overview.uncached,
+        sales_overview.uncached,
+        global_love_metrics.uncached,
+        supply_chain_alerts.uncached,
+        lambda: sales_all_products({}),
+    ]
+    ready.release()
+    start.wait()
+
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for query in queries:
+            query()
+            count += 1
+    results.put({"queries": count, **_rss_kb()})
+
+
+def run(mode_name, workers, seconds):
+    mode, mmap_size = MODES[mode_name]
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, mmap_size, seconds, ready, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    start.set()
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    return {
+        "mode": mode_name,
+        "workers": workers,
+        "qps": sum(item["queries"] for item in stats) / seconds,
+        "rss_mb": sum(item["VmRSS"] for item in stats) / len(stats) / 1024,
+        "anon_mb": sum(item.get("RssAnon", 0) for item in stats) / len(stats) / 1024,
+        "file_mb": sum(item.get("RssFile", 0) for item in stats) / len(stats) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and RSS per worker by SQLite serving mode")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ensure_db()
+
+    print(f"{'mode':<16} {'workers':>7} {'queries/s':>10} {'rss MB':>8} {'anon MB':>8} {'file MB':>8}")
+    for mode_name in args.modes.split(","):
+        for workers in [int(item) for item in args.workers.split(",")]:
+            row = run(mode_name, workers, args.seconds)
+            print(
+                f"{row['mode']:<16} {row['workers']:>7} {row['qps']:>10.0f} "
+                f"{row['rss_mb']:>8.1f} {row['anon_mb']:>8.1f} {row['file_mb']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import functools
+import multiprocessing
+import time
+
+from app.data_loader import ensure_db
+
+FILTERS = [
+    {},
+    {"category": "bar"},
+    {"channel": "Online"},
+    {"country": "DE"},
+    {"month": "2025-02"},
+]
+
+
+def _workload():
+    from app.ai import build_product_search_index
+    from app.queries import global_love_metrics, sales_filter_options, sales_overview_filtered
+
+    calls = [
+        ("search_index", build_product_search_index.uncached, ()),
+        ("filter_options", sales_filter_options.uncached, ()),
+        ("global_love", global_love_metrics.uncached, ()),
+    ]
+    calls.extend(
+        (f"sales:{sorted(filters.items())}", sales_overview_filtered.uncached, (filters,))
+        for filters in FILTERS
+    )
+    return calls
+
+
+def _worker(mode, rounds, ready, start, results):
+    from app.cache import DATA_NAMESPACE, _plain, get_or_compute
+
+    computes = 0
+
+    def counted(fn, args):
+        def compute():
+            nonlocal computes
+            computes += 1
+            return fn(*args)
+
+        return compute
+
+    calls = _workload()
+    local = {}
+    if mode == "per-process":
+        for name, fn, args in calls:
+            local[name] = functools.lru_cache(maxsize=1)(
+                lambda fn=fn, args=args: _plain(counted(fn, args)())
+            )
+
+    ready.release()
+    start.wait()
+    began = time.perf_counter()
+    for _ in range(rounds):
+        for name, fn, args in calls:
+            if mode == "per-process":
+                local[name]()
+            else:
+                get_or_compute(DATA_NAMESPACE, f"bench:{name}", counted(fn, args))
+    results.put({"computes": computes, "seconds": time.perf_counter() - began, "calls": rounds * len(calls)})
+
+
+def run(mode, workers, rounds):
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, rounds, ready, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    start.set()
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "computes": sum(item["computes"] for item in stats),
+        "seconds": max(item["seconds"] for item in stats),
+        "calls": sum(item["calls"] for item in stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared SQLite result cache vs per-process lru_cache")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    ensure_db()
+    from app.cache import bump_version
+
+    print(f"{'mode':<12} {'workers':>7} {'computes':>9} {'wall s':>8} {'calls/s':>9}")
+    for workers in [int(item) for item in args.workers.split(",")]:
+        for mode in ("per-process", "shared"):
+            # Every run starts cold, as after a deploy or an ingest.
+            bump_version()
+            row = run(mode, workers, args.rounds)
+            print(
+                f"{mode:<12} {workers:>7} {row['computes']:>9} {row['seconds']:>8.2f} "
+                f"{row['calls'] / row['seconds']:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -31,7 +31,24 @@ foreach ($item in $include) {
 
 Get-ChildItem -Path $staging -Recurse -Directory -Filter "__pycache__" | Remove-Item -Recurse -Force -ErrorAction SilentlyContinue
 Get-ChildItem -Path $staging -Recurse -File -Filter "*.pyc" | Remove-Item -Force -ErrorAction SilentlyContinue
-Get-ChildItem -Path $staging -Recurse -File -Filter "valentines.db" | Remove-Item -Force -ErrorAction SilentlyContinue
+Get-ChildItem -Path $staging -Recurse -File -Filter "valentines.db*" | Remove-Item -Force -ErrorAction SilentlyContinue
+
+# Ship a prebuilt, read-only snapshot so the app skips CSV ingestion on boot.
+$snapshot = Join-Path $staging "app\valentines.db"
+Push-Location $root
+try {
+  python -m app.snapshot --output $snapshot
+  if ($LASTEXITCODE -ne 0) {
+    throw "Snapshot build failed"
+  }
+  # Ship the trained moderation model too, so no worker trains on its first request.
+  python -m app.moderation --output (Join-Path $staging "app\moderation_model.joblib")
+  if ($LASTEXITCODE -ne 0) {
+    throw "Moderation model build failed"
+  }
+} finally {
+  Pop-Location
+}
 
 Compress-Archive -Path (Join-Path $staging "*") -DestinationPath $zipPath
 Remove-Item $staging -Recurse -Force